@@ -17,13 +17,27 @@ A command-line utility for calculating the GC percentage of a genomic sequence.
 """
 
 import argparse as ap
+import os
+import shutil
 import sys
-import gzip
-from Bio import SeqIO
-import pyBigWig
-
-
-def get_args():
+import tempfile
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from .compute import (Composition, DEFAULT_COMPOSITION, METRICS, composition_prefix, encode_sequence,
+                      interval_metric, multi_stream_gc, multi_window_gc)
+from .readers import (CHUNK_SIZE, STDIN, compression_type, fasta_lengths, fetch_sequence, is_batch, load_fai,
+                      open_fasta, parse_inputs, read_bed, region_records, scan_fasta, split_sequence, stream_records,
+                      write_fai)
+from .index import ResultCache, index_records, load_gc_index, write_gc_index
+from .writers import (Track, TrackOptions, VALUE_FORMATS, WRITE_BLOCK, close_results_file, generate_write_content,
+                      open_gzip, open_results_file, open_results_files, rename_results_file, write_title)
+from .pipeline import parallel_results, pipeline_records, split_results
+from .stats import Progress, RunStats, format_stats, write_stats
+
+
+def get_args(argv=None):
     """
     Helper function uses ArgParser to handler all the command-line input options.
     All arguments are keyword arguments. The required arguments are grouped under "required named arguments" section in
@@ -31,39 +45,143 @@ def get_args():
 
     required named arguments:
 
-    -i INPUT_FILE, --input_file INPUT_FILE
-    INPUTFILE: Name of the input file in FASTA format
+    -i INPUT_FILE [INPUT_FILE ...], --input_file INPUT_FILE [INPUT_FILE ...]
+    INPUTFILE: Name of the input file in FASTA format. Several files or glob patterns can be given, see -o and -j.
+    "-" reads a single (possibly gzip compressed) FASTA file from standard input in one pass, see -st.
 
-    -w WINDOW_SIZE, --window_size WINDOW_SIZE
+    -w WINDOW_SIZE [WINDOW_SIZE ...], --window_size WINDOW_SIZE [WINDOW_SIZE ...]
     WINDOW_SIZE: Number of base pairs that the GC percentage is calculated for
 
-    -s SHIFT, --shift SHIFT
+    -s SHIFT [SHIFT ...], --shift SHIFT [SHIFT ...]
     SHIFT: The shift increment (step size)
 
+    Several window sizes and shifts are paired in order; a single value is used with every value of the other option.
+    -w and -s are not needed when the pairs are given with -rf.
+
     optional arguments:
 
     -h, --help
     Show the help message and exit
 
     -o OUTPUT_FILE, --output_file OUTPUT_FILE
-    OUTPUT_FILE: Name of the output file
+    OUTPUT_FILE: Name of the output file. In batch mode (several -i values, a glob pattern or -m), the directory where
+    an output file named after each input file is written, even when only one input file matches.
 
     -ot, --omit_tail
     Use if the trailing sequence should be omitted. Default behaviour is to retain the leftover sequence.
 
-    -f {wiggle,bigwig,gzip}, --output_format {wiggle,bigwig,gzip}
-    Choose output formats from wiggle, bigwig or gzip compressed wiggle file.
+    -f {wiggle,bigwig,gzip,bedgraph,npy}, --output_format {wiggle,bigwig,gzip,bedgraph,npy}
+    Choose output formats from wiggle, bigwig, gzip compressed wiggle, bedGraph or NumPy file. bedGraph output merges
+    consecutive windows with the same value into one interval. npy output is the values of the windows as one array,
+    with a JSON manifest of the records in OUTPUT_FILE.json.
+
+    -one, --one_file
+    Force one file output
+
+    -st, --stream
+    Read the input file in fixed-size chunks instead of loading whole sequences into memory. Standard input (-i -) is
+    always streamed, except for bigwig, bedgraph, npy and fixedStep output, which need the length of each sequence
+    before its windows are written and load whole sequences from standard input even with -st.
+
+    -cs CHUNK_SIZE, --chunk_size CHUNK_SIZE
+    CHUNK_SIZE: Number of bytes read from the input file at a time in streaming mode
+
+    -j JOBS, --jobs JOBS
+    JOBS: Number of worker processes used to calculate sequences in parallel, or input files in parallel when there
+    is more than one input file
+
+    -ss SPLIT_SIZE, --split_size SPLIT_SIZE
+    SPLIT_SIZE: Number of base pairs calculated by each worker when a single sequence is split across the workers
+    (at least one window)
+
+    -fs, --fixed_step
+    Write fixedStep wiggle (and fixed-step bigwig) entries instead of variableStep entries.
+
+    -r REGION, --region REGION
+    REGION: Only calculate the region chrom:start-end (1-based, inclusive) of a sequence. Can be used more than once.
+
+    -t THREADS, --threads THREADS
+    THREADS: Number of threads used to decompress BGZF (bgzip) input files and to compress gzip output files
+
+    -cl {1,2,3,4,5,6,7,8,9}, --compress_level {1,2,3,4,5,6,7,8,9}
+    Compression level of gzip output files, from 1 (fastest) to 9 (smallest)
+
+    -rf RESOLUTION_FILE, --resolution_file RESOLUTION_FILE
+    RESOLUTION_FILE: File with one "window_size shift" pair per line, calculated together with any -w/-s pairs
+
+    -m MANIFEST, --manifest MANIFEST
+    MANIFEST: File with the name (or glob pattern) of one input file per line, added to the -i input files
+
+    -ni, --no_index
+    Read the FASTA file even if there is a GC index (.gci, see "GC_analysis index") next to it.
+
+    -cd CACHE_DIR, --cache_dir CACHE_DIR
+    CACHE_DIR: Directory where the results of each sequence are cached and reused by later runs
+
+    -csz CACHE_SIZE, --cache_size CACHE_SIZE
+    CACHE_SIZE: Maximum size of the cache directory in MiB; the least recently used results are removed
+
+    -sts, --stats
+    Write the time spent reading, calculating and writing, the bases, windows and bytes processed and the peak memory
+    use of the run to stderr.
+
+    -sf STATS_FILE, --stats_file STATS_FILE
+    STATS_FILE: Name of a JSON file where the statistics of the run and of each sequence are written
+
+    -p, --progress
+    Report the sequence being written, the bases done, the throughput and the estimated time left on stderr.
+
+    -hb HEARTBEAT, --heartbeat HEARTBEAT
+    HEARTBEAT: Name of a JSON file that is replaced with the progress of the run every PROGRESS_INTERVAL seconds
+
+    -pi PROGRESS_INTERVAL, --progress_interval PROGRESS_INTERVAL
+    PROGRESS_INTERVAL: Number of seconds between two progress reports
+
+    -mt {gc,n,softmask,skew,cpg} [{gc,n,softmask,skew,cpg} ...], --metrics {gc,n,softmask,skew,cpg} [...]
+    Tracks calculated from the same scan of each sequence: GC percentage, N percentage, soft-masked (lower-case)
+    percentage, GC skew and CpG observed/expected ratio. With more than one, the output files are named
+    OUTPUT_FILE_METRIC.
+
+    -ic, --ignore_case
+    Count soft-masked (lower-case) g and c as G and C in the gc, skew and cpg tracks.
+
+    -en, --exclude_n
+    Divide the GC percentage of a window by its number of bases other than N instead of its length.
+
+    -rg REGIONS, --regions REGIONS
+    REGIONS: BED file of intervals. Instead of windows, the metrics of every interval are written as the BED lines
+    with one more column per metric, to OUTPUT_FILE.bed (or stdout). -w and -s are not needed.
+
+    -pl, --pipeline
+    Read the input file, calculate the windows and compress the output in background threads connected by bounded
+    queues, so that reading, calculating and writing overlap. Not used with -cd.
+
+    -mg, --merge
+    Merge consecutive windows with the same value into one interval in bigwig output, as in bedGraph output.
+
+    -fr, --fraction
+    Write unrounded fractions from 0 to 1 as float32 instead of whole percentages as uint8 in npy output.
 
-    :returns: str, str/None, int, int, Bool, str
+    -wf, --write_fai
+    Save the index that -r, -rg and -j build by scanning a FASTA file without one as a samtools .fai index next to it,
+    so that later runs do not scan it again. Without -wf, nothing is written next to the input file.
+
+    The window size and shift pairs are returned as the "resolutions" attribute, a list of (int, int), and the input
+    files as the "input_files" attribute, a list of str, with the "batch" attribute set when they are processed in batch
+    mode (see is_batch()). The metrics and their options are returned as the
+    "composition" attribute, a Composition.
+
+    :param argv: list of str, command-line arguments (default: sys.argv[1:])
+    :returns: argparse.Namespace
     """
     parser = ap.ArgumentParser()
     requiredNamed = parser.add_argument_group('required named arguments')
-    requiredNamed.add_argument("-i", "--input_file", type=str, help="Name of the input file in FASTA format",
-                               required=True)
-    requiredNamed.add_argument("-w", "--window_size", type=int,
-                               help="Number of base pairs where the GC percentage is calculated for",
-                               required=True)
-    requiredNamed.add_argument("-s", "--shift", type=int, help="The shift increment", required=True)
+    requiredNamed.add_argument("-i", "--input_file", type=str, nargs="+",
+                               help="Name of the input file in FASTA format. Several files or glob patterns can be "
+                                    "given.")
+    requiredNamed.add_argument("-w", "--window_size", type=int, nargs="+",
+                               help="Number of base pairs where the GC percentage is calculated for")
+    requiredNamed.add_argument("-s", "--shift", type=int, nargs="+", help="The shift increment")
     parser.add_argument("-o", "--output_file", type=str, help="Name of the output file")
     parser.add_argument("-ot", "--omit_tail", action="store_true", help="True: if the trailing sequence should be "
                                                                         "omitted. Default behaviour is to retain "
@@ -71,172 +189,797 @@ def get_args():
                         default=False)
     parser.add_argument("-f", "--output_format", type=str, choices=["wiggle",
                                                                     "bigwig",
-                                                                    "gzip"],
+                                                                    "gzip",
+                                                                    "bedgraph",
+                                                                    "npy"],
                         default="wiggle")
     parser.add_argument("-one", "--one_file", action="store_true", help="Force one file output", default=False)
-    args = parser.parse_args()
+    parser.add_argument("-st", "--stream", action="store_true", help="Read the input file in fixed-size chunks "
+                                                                     "instead of loading whole sequences into "
+                                                                     "memory.",
+                        default=False)
+    parser.add_argument("-cs", "--chunk_size", type=int, help="Number of bytes read from the input file at a time "
+                                                              "in streaming mode",
+                        default=CHUNK_SIZE)
+    parser.add_argument("-j", "--jobs", type=int, help="Number of worker processes used to calculate sequences in "
+                                                       "parallel",
+                        default=1)
+    parser.add_argument("-ss", "--split_size", type=int, help="Number of base pairs calculated by each worker when a "
+                                                              "single sequence is split across the workers")
+    parser.add_argument("-fs", "--fixed_step", action="store_true", help="Write fixedStep wiggle (and fixed-step "
+                                                                         "bigwig) entries instead of variableStep "
+                                                                         "entries.",
+                        default=False)
+    parser.add_argument("-r", "--region", type=str, action="append", help="Only calculate the region "
+                                                                          "chrom:start-end (1-based, inclusive) of a "
+                                                                          "sequence. Can be used more than once.")
+    parser.add_argument("-t", "--threads", type=int, help="Number of threads used to decompress BGZF (bgzip) input "
+                                                          "files and to compress gzip output files",
+                        default=1)
+    parser.add_argument("-cl", "--compress_level", type=int, choices=range(1, 10),
+                        help="Compression level of gzip output files, from 1 (fastest) to 9 (smallest)",
+                        default=9)
+    parser.add_argument("-rf", "--resolution_file", type=str, help="File with one \"window_size shift\" pair per "
+                                                                   "line, calculated together with any -w/-s pairs")
+    parser.add_argument("-m", "--manifest", type=str, help="File with the name (or glob pattern) of one input file "
+                                                           "per line, added to the -i input files")
+    parser.add_argument("-ni", "--no_index", action="store_true", help="Read the FASTA file even if there is a GC "
+                                                                       "index (.gci) next to it",
+                        default=False)
+    parser.add_argument("-cd", "--cache_dir", type=str, help="Directory where the results of each sequence are "
+                                                             "cached and reused by later runs")
+    parser.add_argument("-csz", "--cache_size", type=int, help="Maximum size of the cache directory in MiB; the "
+                                                               "least recently used results are removed",
+                        default=1024)
+    parser.add_argument("-sts", "--stats", action="store_true", help="Write the time spent reading, calculating and "
+                                                                     "writing, the bases, windows and bytes "
+                                                                     "processed and the peak memory use to stderr",
+                        default=False)
+    parser.add_argument("-sf", "--stats_file", type=str, help="Name of a JSON file where the statistics of the run "
+                                                              "and of each sequence are written")
+    parser.add_argument("-p", "--progress", action="store_true", help="Report the sequence being written, the bases "
+                                                                      "done, the throughput and the estimated time "
+                                                                      "left on stderr",
+                        default=False)
+    parser.add_argument("-hb", "--heartbeat", type=str, help="Name of a JSON file that is replaced with the progress "
+                                                             "of the run every PROGRESS_INTERVAL seconds")
+    parser.add_argument("-pi", "--progress_interval", type=float, help="Number of seconds between two progress "
+                                                                       "reports",
+                        default=10.0)
+    parser.add_argument("-mt", "--metrics", type=str, nargs="+", choices=METRICS, help="Tracks calculated from the "
+                                                                                      "same scan of each sequence",
+                        default=["gc"])
+    parser.add_argument("-ic", "--ignore_case", action="store_true", help="Count soft-masked (lower-case) g and c as "
+                                                                          "G and C",
+                        default=False)
+    parser.add_argument("-en", "--exclude_n", action="store_true", help="Divide the GC percentage of a window by its "
+                                                                        "number of bases other than N",
+                        default=False)
+    parser.add_argument("-rg", "--regions", type=str, help="BED file of intervals whose metrics are written instead "
+                                                           "of windows")
+    parser.add_argument("-pl", "--pipeline", action="store_true", help="Read, calculate and write in separate "
+                                                                       "threads connected by bounded queues",
+                        default=False)
+    parser.add_argument("-mg", "--merge", action="store_true", help="Merge consecutive windows with the same value "
+                                                                    "into one interval in bigwig output",
+                        default=False)
+    parser.add_argument("-fr", "--fraction", action="store_true", help="Write unrounded fractions as float32 in npy "
+                                                                       "output",
+                        default=False)
+    parser.add_argument("-wf", "--write_fai", action="store_true", help="Save the index built by -r, -rg and -j as "
+                                                                        "a .fai file next to the input file",
+                        default=False)
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+    return args
 
-    return args.input_file, args.output_file, args.window_size, args.shift, args.omit_tail, args.output_format,\
-           args.one_file
+
+def check_args(parser, args):
+    """
+    Check the combination of command-line options and add the attributes derived from them (see get_args()). Invalid
+    combinations are reported with parser.error(), which exits.
+    :param parser: argparse.ArgumentParser
+    :param args: argparse.Namespace as returned by parser.parse_args()
+    :return: None
+    """
+    try:
+        if args.regions and not (args.window_size or args.shift or args.resolution_file):
+            # Intervals instead of windows
+            args.resolutions = []
+        else:
+            args.resolutions = parse_resolutions(args.window_size, args.shift, args.resolution_file)
+        args.input_files = parse_inputs(args.input_file, args.manifest)
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+    check_inputs(parser, args)
+    if len(args.resolutions) > 1 and args.output_file is None:
+        parser.error("an output filename (-o) is needed for more than one window size and shift")
+    if args.fraction and (args.output_format != "npy" or args.regions):
+        parser.error("fractions (-fr) are only written to npy output (-f npy)")
+    args.composition = Composition(tuple(dict.fromkeys(args.metrics)), args.ignore_case, args.exclude_n,
+                                   args.fraction)
+    if len(args.composition.metrics) > 1 and args.output_file is None and not args.regions:
+        parser.error("an output filename (-o) is needed for more than one metric")
+
+
+def check_inputs(parser, args):
+    """
+    Check the input files given with -i and -m (see check_args()), and set the "batch" attribute, or the "input_file"
+    attribute outside batch mode.
+    :param parser: argparse.ArgumentParser
+    :param args: argparse.Namespace with the "input_files" attribute
+    :return: None
+    """
+    args.batch = is_batch(args.input_file, args.manifest)
+    if args.batch:
+        if args.output_file is None:
+            parser.error("an output directory (-o) is needed for several input files, glob patterns or -m")
+        if os.path.exists(args.output_file) and not os.path.isdir(args.output_file):
+            parser.error(f"{args.output_file} is not a directory; -o is the output directory with several input "
+                         "files, glob patterns or -m")
+        names = [output_name(input_file) for input_file in args.input_files]
+        if len(set(names)) < len(names):
+            parser.error("input files with the same name would be written to the same output file")
+    else:
+        args.input_file = args.input_files[0]
+    if STDIN in args.input_files:
+        if args.batch:
+            parser.error("standard input (-i -) cannot be read together with other input files")
+        if args.region or args.regions or args.jobs > 1:
+            parser.error("-r, -rg and -j need an input file that can be read more than once, not standard input")
 
 
-def open_results_file():
+def get_index_args(argv=None):
     """
-    A helper function to create the output file based on chosen output format and specified output filename.
+    Handle the command-line options of "GC_analysis index", which writes the GC index (.gci) of FASTA files so that
+    later runs calculate any window size, shift or region without reading the FASTA file.
+
+    -i INPUT_FILE [INPUT_FILE ...], --input_file INPUT_FILE [INPUT_FILE ...]
+    INPUTFILE: Name of the input file in FASTA format. Several files or glob patterns can be given.
 
-    If output filename is given and output format is "wiggle", a text file called "OUTPUT_FILENAME.wig" will be opened
-    with python's textIO wrapper, where OUTPUT_FILENAME is the string given after "-o" option in the commandline.
+    -m MANIFEST, --manifest MANIFEST
+    MANIFEST: File with the name (or glob pattern) of one input file per line, added to the -i input files
 
-    If output filename is given and output format is "gzip", a compressed file called "OUTPUT_FILENAME.gz" will be
-    opened with gzip library, where OUTPUT_FILENAME is the string given after "-o" option in the commandline.
+    -t THREADS, --threads THREADS
+    THREADS: Number of threads used to decompress BGZF (bgzip) input files
 
-    If output filename is given and output format is "bigwig", a binary file called "OUTPUT_FILENAME.bw" will be
-    opened with pyBigWig, where OUTPUT_FILENAME is the string given after "-o" option in the commandline.
+    :param argv: list of str, command-line arguments after "index" (default: sys.argv[2:])
+    :returns: argparse.Namespace
+    """
+    parser = ap.ArgumentParser(prog="GC_analysis index",
+                               description="Write the GC index (.gci) of FASTA files next to them.")
+    parser.add_argument("-i", "--input_file", type=str, nargs="+",
+                        help="Name of the input file in FASTA format. Several files or glob patterns can be given.")
+    parser.add_argument("-m", "--manifest", type=str, help="File with the name (or glob pattern) of one input file "
+                                                           "per line, added to the -i input files")
+    parser.add_argument("-t", "--threads", type=int, help="Number of threads used to decompress BGZF (bgzip) input "
+                                                          "files",
+                        default=1)
+    args = parser.parse_args(argv)
+    try:
+        args.input_files = parse_inputs(args.input_file, args.manifest)
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+    if STDIN in args.input_files:
+        parser.error("a GC index is written next to its FASTA file, not for standard input")
+    return args
+
+
+def parse_resolutions(window_sizes, shifts, resolution_file=None):
+    """
+    Pair the window sizes and shifts given on the command line and add the pairs listed in a resolution file. Blank
+    lines and lines starting with "#" in the file are skipped. Repeated pairs are only calculated once.
+    :param window_sizes: list of int/None, values of "-w"
+    :param shifts: list of int/None, values of "-s"
+    :param resolution_file: str/None, name of the resolution file
+    :return: list of (int, int), window size and shift pairs
+    """
+    window_sizes, shifts = window_sizes or [], shifts or []
+    if len(window_sizes) == 1:
+        window_sizes = window_sizes * len(shifts)
+    elif len(shifts) == 1:
+        shifts = shifts * len(window_sizes)
+    if len(window_sizes) != len(shifts):
+        raise ValueError("-w and -s need the same number of values, or a single value")
+    resolutions = list(zip(window_sizes, shifts))
+    if resolution_file:
+        with open(resolution_file, encoding="utf-8") as spec:
+            for line in spec:
+                if line.strip() and not line.lstrip().startswith("#"):
+                    try:
+                        window_size, shift = map(int, line.split())
+                    except ValueError as err:
+                        raise ValueError(f"{resolution_file} should contain a window size and a shift per line, "
+                                         f"not: {line.strip()}") from err
+                    resolutions.append((window_size, shift))
+    if not resolutions:
+        raise ValueError("the window size and shift (-w and -s, or -rf) are required")
+    if min(min(resolution) for resolution in resolutions) < 1:
+        raise ValueError("window sizes and shifts must be positive")
+    return list(dict.fromkeys(resolutions))
+
+
+def output_name(input_file):
+    """
+    Name the output of an input file in batch mode: the file name without its directory, compression extension and
+    FASTA extension.
+    :param input_file: str
+    :return: str
+    """
+    name = os.path.basename(input_file)
+    for extensions in ((".gz", ".bgz"), (".fasta", ".fa", ".fna", ".fas")):
+        for extension in extensions:
+            if name.endswith(extension) and len(name) > len(extension):
+                name = name[:-len(extension)]
+                break
+    return name
 
-    If output filename is not specified, the result will be written to stdout following wiggle format.
 
-    :return: file object
+def load_entries(args, scan=False):
     """
-    if output_file:
-        if output_format == "wiggle":
-            file = open(output_file + ".wig", "w+")
-        elif output_format == "gzip":
-            file = gzip.open(output_file + ".wig.gz", "w+")
-        elif output_format == "bigwig":
-            file = pyBigWig.open(output_file + ".bw", "w+")
-    else:
-        file = sys.stdout
-    return file
+    Find the records of the input file: in its GC index when the run only needs G and C counts, in its .fai index, or
+    by scanning it when scan is set (the .fai index is then only kept in memory, unless --write_fai saves it for the
+    next run). Standard input is read once from the start, without any index.
+    :param args: argparse.Namespace as returned by get_args(), with input_file set to a single file
+    :param scan: Bool, scan the input file when it has no index
+    :return: GCIndex/None, and list of FastaEntry, or None when the records are only known by reading the file
+    """
+    input_file = args.input_file
+    stdin = input_file == STDIN
+    # A GC index only counts G and C
+    gc_index = None if args.no_index or stdin or args.composition != DEFAULT_COMPOSITION else \
+        load_gc_index(input_file)
+    entries = gc_index.entries if gc_index is not None else None if stdin else load_fai(input_file)
+    if entries is None and scan:
+        entries = scan_fasta(input_file)
+        if args.write_fai and compression_type(input_file) != "gzip":
+            # samtools only indexes plain and BGZF files; seeking in a plain gzip file means decompressing again
+            write_fai(input_file, entries)
+    if entries is not None and not entries:
+        # No sequence in fasta file, corrupted
+        sys.stdout.write(f"WARNING! {input_file} contains no sequence data.\n")
+        raise TypeError
+    return gc_index, entries
 
 
-def open_results_files():
+def open_bed_output(args):
+    """
+    Open the output of --regions: OUTPUT_FILENAME.bed, OUTPUT_FILENAME.bed.gz for gzip output, or stdout.
+    :param args: argparse.Namespace as returned by get_args()
+    :return: file object, and function that writes a str to it
+    """
+    if args.output_format == "bigwig":
+        sys.stderr.write("WARNING! Intervals are written as a BED table. A BED file will be generated instead.\n")
+    if args.output_file is None:
+        return sys.stdout, sys.stdout.write
+    if args.output_format == "gzip":
+        result = open_gzip(args.output_file + ".bed.gz", args.compress_level, args.threads)
+        return result, lambda text: result.write(bytes(text, "utf-8"))
+    result = open(args.output_file + ".bed", "w", encoding="utf-8")  # pylint: disable=consider-using-with
+    return result, result.write
+
+
+def run_regions(args):
     """
-    A helper function to create the output file based on chosen output format and specified output filename. Used when
-    multiple sequences present in one input file. "_seqNUM" will be added to the end of the output filename before the
-    file extension.
+    Calculate the metrics of every interval of a BED file (--regions) and write the BED lines with one more column
+    per metric. Each sequence with intervals is read (or looked up in the GC index) once, and every interval is then
+    answered from its cumulative counts, so the time depends on the number of intervals rather than their length.
+    Intervals that extend past the end of a sequence are cut at its end.
+    :param args: argparse.Namespace as returned by get_args(), with input_file set to a single file
+    :return: None
+    """
+    input_file, composition = args.input_file, args.composition
+    groups = read_bed(args.regions)
+    gc_index, entries = load_entries(args, scan=True)
+    names = {entry.name: entry for entry in entries}
+    result, write_lines = open_bed_output(args)
+    line_format = "%s" + "".join("\t" + VALUE_FORMATS.get(metric, "%d") for metric in composition.metrics) + "\n"
+    handle = None if gc_index is not None else open_fasta(input_file, args.threads)
+    for chrom, (lines, starts, ends) in groups.items():
+        if chrom not in names:
+            sys.stderr.write(f"WARNING! Sequence {chrom} is not in {input_file}. Its {len(lines)} intervals are "
+                             "skipped.\n")
+            continue
+        entry = names[chrom]
+        if gc_index is not None:
+            prefix = gc_index.prefix(entry)
+        else:
+            prefix = composition_prefix(encode_sequence(fetch_sequence(handle, entry)), *composition)
+        starts, ends = np.minimum(starts, entry.length), np.minimum(ends, entry.length)
+        values = [interval_metric(prefix, metric, starts, ends).tolist() for metric in composition.metrics]
+        for block in range(0, len(lines), WRITE_BLOCK):
+            rows = list(zip(lines[block:block + WRITE_BLOCK],
+                            *(column[block:block + WRITE_BLOCK] for column in values)))
+            write_lines((line_format * len(rows)) % tuple(itertools.chain.from_iterable(rows)))
+        del prefix
+    if handle is not None:
+        handle.close()
+    if result is sys.stdout:
+        sys.stdout.flush()
+    else:
+        result.close()
 
-    If output filename is given and output format is "wiggle", a text file called "OUTPUT_FILENAME_seqNUM.wig" will be
-    opened with python's textIO wrapper, where OUTPUT_FILENAME is the string given after "-o" option in the commandline
-    and NUM is the ordinal number of the sequence.
 
-    If output filename is given and output format is "gzip", a compressed file called "OUTPUT_FILENAME_seqNUM.gz" will
-    be opened with gzip library, where OUTPUT_FILENAME is the string given after "-o" option in the commandline
-    and NUM is the ordinal number of the sequence.
+def track_formats(args, error):
+    """
+    Choose the output format of each window size and shift pair. bigwig and bedGraph files cannot hold overlapping
+    windows, and only wiggle and bedGraph output can be shown on stdout; wiggle output is written instead.
+    :param args: argparse.Namespace as returned by get_args()
+    :param error: list of str, to which the warnings repeated at the end of stdout output are added
+    :return: list of str, output format of each window size and shift pair
+    """
+    output_format, resolutions = args.output_format, args.resolutions
+    formats = []
+    for window_size, shift in resolutions:
+        if output_format in ("bigwig", "bedgraph") and window_size > shift:
+            name = "BigWig" if output_format == "bigwig" else "bedGraph"
+            if len(resolutions) > 1:
+                sys.stderr.write(f"WARNING! {name} file does not allow overlapped items. A wiggle file will be "
+                                 f"generated instead for -w {window_size} -s {shift}.\n")
+            else:
+                sys.stderr.write(f"WARNING! {name} file does not allow overlapped items. "
+                                 "A wiggle file will be generated instead.\n")
+                error.append(f"WARNING! {name} file does not allow overlapped items. "
+                             "A wiggle file was generated instead.\n")
+            formats.append("wiggle")
+        else:
+            formats.append(output_format)
+
+    if output_format not in ("wiggle", "bedgraph") and args.output_file is None:
+        sys.stderr.write(f"WARNING! An output filename is needed to save output as {output_format}. "
+                         "The result is shown below:\n")
+        error.append(f"WARNING! An output filename is needed to save output as {output_format}. "
+                     "The result is shown above.\n")
+        formats = ["wiggle"] * len(resolutions)
+    return formats
+
+
+def make_tracks(args, formats, pipeline, stats):
+    """
+    Create one track per metric, window size and shift, in the order of multi_window_gc(). With more than one, the
+    output files are named OUTPUT_FILENAME_METRIC and/or OUTPUT_FILENAME_wWINDOW_SIZE_sSHIFT.
+    :param args: argparse.Namespace as returned by get_args()
+    :param formats: list of str, output format of each window size and shift pair, as returned by track_formats()
+    :param pipeline: Bool, compress gzip output in a background thread
+    :param stats: RunStats/None
+    :return: list of Track
+    """
+    metrics, resolutions = args.composition.metrics, args.resolutions
+    tracks = []
+    for metric in metrics:
+        for (window_size, shift), track_format in zip(resolutions, formats):
+            track_file = args.output_file
+            if len(metrics) > 1:
+                track_file = f"{track_file}_{metric}"
+            if len(resolutions) > 1:
+                track_file = f"{track_file}_w{window_size}_s{shift}"
+            track = Track(TrackOptions(window_size, shift, track_format, track_file, args.fixed_step,
+                                       args.compress_level, args.threads, metric, pipeline, args.merge, args.fraction))
+            track.write_content = generate_write_content(track)
+            if stats is not None:
+                track.write_content = stats.timed_content(track.write_content)
+            tracks.append(track)
+    return tracks
+
+
+def make_progress(args, tracks, entries):
+    """
+    Create the progress report of a run (--progress and --heartbeat) and wrap the write_content functions of the
+    tracks with it.
+    :param args: argparse.Namespace as returned by get_args(), with input_file set to a single file
+    :param tracks: list of Track
+    :param entries: list of FastaEntry/None, as returned by load_entries()
+    :return: Progress, or None without --progress/--heartbeat
+    """
+    if not (args.progress or args.heartbeat):
+        return None
+    progress = Progress(args.input_file, args.progress_interval, args.progress, args.heartbeat, len(tracks))
+    for index, track in enumerate(tracks):
+        track.write_content = progress.wrap(track.write_content, index, track.options.window_size)
+    if entries is not None and not args.region:
+        progress.total_bases = sum(entry.length for entry in entries)
+    return progress
 
-    If output filename is given and output format is "bigwig", a binary file called "OUTPUT_FILENAME_seqNUM.bw" will be
-    opened with pyBigWig, where OUTPUT_FILENAME is the string given after "-o" option in the commandline
-    and NUM is the ordinal number of the sequence.
 
-    If output filename is not specified, the result will be written to stdout following wiggle format.
+def stream_lengths(args, tracks, gc_index, entries):
+    """
+    Decide whether the input file is read in chunks, and find the length of each sequence when the output needs it
+    before the windows are written: bigwig needs every sequence length in the header before any entry is added, and
+    fixedStep, bedGraph and npy output need it to recognise the trailing window. Standard input cannot be read twice
+    to find the lengths first, so its sequences are loaded whole when the lengths are needed, even with --stream.
+    :param args: argparse.Namespace as returned by get_args(), with input_file set to a single file
+    :param tracks: list of Track
+    :param gc_index: GCIndex/None
+    :param entries: list of FastaEntry/None, as returned by load_entries()
+    :return: Bool (streaming mode), and list of int, or None when the lengths are not needed or not read here
+    """
+    stdin = args.input_file == STDIN
+    need_length = args.fixed_step or any(track.options.output_format in ("bigwig", "bedgraph", "npy")
+                                         for track in tracks)
+    if args.stream and stdin and need_length:
+        sys.stderr.write("WARNING! Sequence lengths are needed before the windows of standard input are written. "
+                         "Whole sequences will be loaded instead of streaming.\n")
+    stream = (args.stream or stdin) and not (stdin and need_length)
+    if not (stream and need_length) or gc_index is not None or args.region or args.jobs > 1:
+        return stream, None
+    return stream, [entry.length for entry in entries] if entries else fasta_lengths(args.input_file, args.chunk_size)
+
+
+def open_cache(args, gc_index=None, stream=False):
+    """
+    Open the result cache (--cache_dir) of a run. Only whole records read from the FASTA file are cached, so the cache
+    is bypassed, with a warning, when the records come from a GC index or are read in chunks (--stream, or standard
+    input), and with --region, --regions and --jobs.
+    :param args: argparse.Namespace as returned by get_args(), with input_file set to a single file
+    :param gc_index: GCIndex/None
+    :param stream: Bool, the records are read in chunks
+    :return: ResultCache, or None without --cache_dir or when the cache is bypassed
+    """
+    if not args.cache_dir:
+        return None
+    if args.regions:
+        bypass = "--regions"
+    elif gc_index is not None:
+        bypass = "a GC index"
+    elif args.region:
+        bypass = "--region"
+    elif args.jobs > 1:
+        bypass = "--jobs"
+    elif stream:
+        bypass = "--stream" if args.stream else "standard input"
+    else:
+        return ResultCache(args.cache_dir, args.cache_size << 20, args.composition)
+    sys.stderr.write(f"WARNING! The result cache (-cd) is not used with {bypass}; the results are calculated "
+                     "without it.\n")
+    return None
 
-    :return: file object
+
+def record_source(args, gc_index, entries, pipeline, stats):
+    """
+    Get the records of the input file: from its GC index, from its regions (--region), from the worker processes
+    (--jobs) or from the FASTA file itself.
+    :param args: argparse.Namespace as returned by get_args(), with input_file set to a single file
+    :param gc_index: GCIndex/None
+    :param entries: list of FastaEntry/None, as returned by load_entries()
+    :param pipeline: Bool, decompress the FASTA file in a background thread
+    :param stats: RunStats/None
+    :return: iterable of records, int/None (number of records, when it is known in advance) and the file object of
+    the FASTA file, or None when it is not read here
     """
-    if output_file:
-        if output_format == "wiggle":
-            file = open(output_file + "_seq{}.wig".format(seq_num), "w+")
-        elif output_format == "gzip":
-            file = gzip.open(output_file + "_seq{}.wig.gz".format(seq_num), "w+")
-        elif output_format == "bigwig":
-            file = pyBigWig.open(output_file + "_seq{}.bw".format(seq_num), "w+")
+    input_file, resolutions, omit_tail, composition = args.input_file, args.resolutions, args.omit_tail, \
+        args.composition
+    records_num = len(entries) if entries is not None else None
+    handle = None
+    if gc_index is not None:
+        # The windows are calculated from the index without reading the FASTA file
+        records = index_records(gc_index, args.region)
+        records_num = len(args.region) if args.region else records_num
+    elif args.region:
+        records = region_records(input_file, entries, args.region)
+        records_num = len(args.region)
+    elif args.jobs > 1 and records_num == 1:
+        # A single sequence is split into chunks that are calculated in parallel
+        records = [(entries[0], split_results(input_file, entries[0], args.jobs, resolutions, omit_tail,
+                                              split_size=args.split_size, composition=composition))]
+    elif args.jobs > 1:
+        records = parallel_results(input_file, entries, args.jobs, resolutions, omit_tail, composition=composition)
     else:
-        file = sys.stdout
-    return file
+        handle = open_fasta(input_file, args.threads, pipeline)
+        records = stream_records(handle, args.chunk_size)
+    if stats is not None:
+        # Waiting for the worker processes is calculation; the other paths read (or look up) the records
+        records = stats.timed(records, "compute" if args.jobs > 1 and gc_index is None and not args.region else "read")
+    return records, records_num, handle
 
 
-def write_title():
-    """Write information to the track definition line of the wiggle file.
-    :return: None
+def index_windows(records, resolutions, omit_tail):
     """
+    Calculate the windows of records looked up in a GC index, as returned by index_records().
+    :param records: iterable of FastaEntry, int (start of the region) and IndexPrefix
+    :param resolutions: list of (int, int), window size and shift pairs
+    :param omit_tail: Bool
+    :return: generator of str (record_id), str (description), int/None (sequence length), int/None (end of the
+    content), int (start of the content), list of one int (bases, for --stats) and iterable of blocks of windows
+    """
+    for entry, start, prefix in records:
+        content_len = start + len(prefix) - 1
+        yield (entry.name, entry.description, entry.length, content_len, start, [content_len - start],
+               multi_window_gc(prefix, resolutions, omit_tail, start))
+
 
-    trackline = "track type=wiggle_0 name=\"GC percentage\" description=\"{}\"\n".format(record.description)
-    variablestep = "variableStep chrom={} span={}\n".format(record.id, str(window_size))
-    if output_format == "wiggle":
-        result.write(trackline)
-        result.write(variablestep)
-    elif output_format == "gzip":
-        result.write(bytes(trackline, "utf-8"))
-        result.write(bytes(variablestep, "utf-8"))
-    elif output_format == "bigwig":
-        result.addHeader([(record.id, len(record))])
+def region_windows(records, resolutions, omit_tail, composition):
+    """
+    Calculate the windows of regions read from the FASTA file, as returned by region_records().
+    :param records: iterable of FastaEntry, int (start of the region) and bytes (sequence of the region)
+    :param resolutions: list of (int, int), window size and shift pairs
+    :param omit_tail: Bool
+    :param composition: Composition
+    :return: generator of records, as index_windows()
+    """
+    for entry, start, seq in records:
+        yield (entry.name, entry.description, entry.length, start + len(seq), start, [len(seq)],
+               multi_stream_gc(split_sequence(seq), resolutions, omit_tail, composition, start))
 
 
-def generate_write_content():
+def worker_windows(records):
     """
-    Generate a write_content function to handle writing results to output file.
-    :return: function
+    Pass on the windows of records calculated by the worker processes (--jobs).
+    :param records: iterable of FastaEntry and iterable of blocks of windows
+    :return: generator of records, as index_windows()
     """
-    if output_format == "wiggle":
-        def content(loc, data):
-            result.write(str(loc + 1) + "\t" + str(data) + "\n")
-    elif output_format == "gzip":
-        def content(loc, data):
-            result.write(bytes(str(loc + 1) + "\t" + str(data) + "\n", "utf-8"))
-    elif output_format == "bigwig":
-        def content(loc, data):
-            result.addEntries(record.id, [loc], values=[float(data)], span=window_size)
-    return content
+    for entry, blocks in records:
+        yield entry.name, entry.description, entry.length, entry.length, 0, [entry.length], blocks
 
 
-def generate_result():
+def stream_windows(records, args, lengths, stats):
     """
-    Calculate GC percentage and write to output file.
-    :return: None
+    Calculate the windows of records read in chunks (--stream) while the chunks are read.
+    :param records: iterable of str (record_id), str (description) and iterable of bytes (chunks)
+    :param args: argparse.Namespace as returned by get_args()
+    :param lengths: list of int/None, length of each record when the output needs it
+    :param stats: RunStats/None
+    :return: generator of records, as index_windows()
     """
-    seq_len = len(record)  # Get length of sequence
-    for i in range((seq_len - window_size + shift) // shift):  # Iterate over the total number of shifts
-        frag = record.seq[i * shift: i * shift + window_size]  # Extract the string for counting
-        # Count number of C and G and convert to percentage
-        percent = int(round((frag.count("C") + frag.count("G")) / float(window_size) * 100))
-        write_content(i * shift, percent)
-    if (i + 1) * shift < seq_len and not omit_tail:
-        # if trailing sequence exits and omit_tail is False
-        frag = record.seq[(i + 1) * shift:]
-        percent = int(round((frag.count("C") + frag.count("G")) / float(len(frag)) * 100))
-        write_content((i + 1) * shift, percent)
+    for seq_num, (record_id, description, chunks) in enumerate(records):
+        size = [0]
+        if stats is not None:
+            chunks = stats.timed(chunks, "read", size)
+        seq_len = lengths[seq_num] if lengths is not None else None
+        yield (record_id, description, seq_len, seq_len, 0, size,
+               multi_stream_gc(chunks, args.resolutions, args.omit_tail, args.composition))
 
 
-if __name__ == "__main__":
-    error = []  # Store generated error message, and write to stderr at the end of stdout output
-    input_file, output_file, window_size, shift, omit_tail, output_format, one_file = get_args()[:]
-    new_output_format = output_format
-
-    if output_format == "bigwig" and window_size > shift:
-        sys.stderr.write("WARNING! BigWig file does not allow overlapped items. "
-                         "A wiggle file will be generated instead.\n")
-        error.append("WARNING! BigWig file does not allow overlapped items. A wiggle file was generated instead.\n")
-        new_output_format = "wiggle"
-
-    if output_format != "wiggle" and output_file is None:
-        sys.stderr.write("WARNING! An output filename is needed to save output as {}. "
-                         "The result is shown below:\n".format(output_format))
-        error.append("WARNING! An output filename is needed to save output as {}. "
-                     "The result is shown above.\n".format(output_format))
-        new_output_format = "wiggle"
-
-    output_format = new_output_format
-
-    records = SeqIO.index(input_file, "fasta")
-    records_num = len(records)
-    write_content = generate_write_content()
-    if records_num < 1:
+def whole_windows(records, args, cache, tracks, stats):
+    """
+    Calculate the windows of whole records, or look them up in the result cache (--cache_dir). The sequence is kept
+    whole for its length and cache key, but calculated CHUNK_SIZE bases at a time as with --stream.
+    :param records: iterable of str (record_id), str (description) and iterable of bytes (chunks)
+    :param args: argparse.Namespace as returned by get_args()
+    :param cache: ResultCache/None
+    :param tracks: list of Track, to which cached results are written directly
+    :param stats: RunStats/None
+    :return: generator of records, as index_windows()
+    """
+    composition = args.composition
+    for record_id, description, chunks in records:
+        size = [0]
+        if stats is not None:
+            chunks = stats.timed(chunks, "read", size)
+        seq = b"".join(chunks)
+        if cache is not None:
+            blocks = cache.record_blocks(tracks, record_id, seq, args.omit_tail)
+        else:
+            blocks = multi_stream_gc(split_sequence(seq), args.resolutions, args.omit_tail, composition)
+        yield record_id, description, len(seq), len(seq), 0, size, blocks
+
+
+def record_windows(records, args, gc_index, stream, lengths, *, cache=None, tracks=None, stats=None):
+    """
+    Calculate the windows of the records returned by record_source(), as the mode of the run requires.
+    :param records: iterable of records, as returned by record_source()
+    :param args: argparse.Namespace as returned by get_args(), with input_file set to a single file
+    :param gc_index: GCIndex/None
+    :param stream: Bool, the records are read in chunks
+    :param lengths: list of int/None, as returned by stream_lengths()
+    :param cache: ResultCache/None
+    :param tracks: list of Track
+    :param stats: RunStats/None
+    :return: generator of records, as index_windows()
+    """
+    if gc_index is not None:
+        return index_windows(records, args.resolutions, args.omit_tail)
+    if args.region:
+        return region_windows(records, args.resolutions, args.omit_tail, args.composition)
+    if args.jobs > 1:
+        return worker_windows(records)
+    if stream:
+        return stream_windows(records, args, lengths, stats)
+    return whole_windows(records, args, cache, tracks, stats)
+
+
+def switch_files(tracks, seq_num, single, records_num):
+    """
+    Open the output files of the tracks for a record: for the first record, and for every record when each record is
+    written to its own files. When the number of records is not known in advance, the first record is written to
+    OUTPUT_FILENAME, which is renamed when a second record turns up.
+    :param tracks: list of Track
+    :param seq_num: int, ordinal number of the record
+    :param single: Bool, one output file for all records
+    :param records_num: int/None, number of records, when it is known
+    :return: int/None, number of records, known to be more than one once a second record turns up
+    """
+    # A second sequence with an unknown number of sequences: the first one was written to OUTPUT_FILENAME
+    rename = not single and records_num is None and seq_num == 2
+    for track in tracks:
+        if track.result is None:
+            track.result = open_results_file(track) if single or records_num is None else \
+                open_results_files(track, seq_num)
+        elif not single:
+            close_results_file(track)
+            if rename:
+                rename_results_file(track)
+            track.result = open_results_files(track, seq_num)
+    return seq_num if rename else records_num
+
+
+def write_records(records, tracks, single, records_num, entries, *, progress=None, stats=None):
+    """
+    Write the windows of every record to the output files of the tracks.
+    :param records: iterable of records, as returned by index_windows()
+    :param tracks: list of Track
+    :param single: Bool, one output file for all records
+    :param records_num: int/None, number of records, when it is known in advance
+    :param entries: list of FastaEntry/None, as returned by load_entries()
+    :param progress: Progress/None
+    :param stats: RunStats/None
+    :return: None
+    """
+    for seq_num, (record_id, description, seq_len, content_len, start, size, blocks) in enumerate(records, 1):
+        records_num = switch_files(tracks, seq_num, single, records_num)
+        if progress is not None:
+            if content_len is not None:
+                progress.start_record(record_id, seq_num, start, content_len - start)
+            else:
+                # Streaming mode, where the length is only known from an index
+                progress.start_record(record_id, seq_num, 0, entries[seq_num - 1].length if entries else None)
+        for track in tracks:
+            write_title(track, record_id, description, seq_len, start)
+        for index, starts, percents in blocks:
+            tracks[index].write_content(record_id, content_len, starts, percents)
+        for track in tracks:
+            if track.flush is not None:
+                track.flush()
+        if stats is not None:
+            stats.end_record(record_id, tracks, size[0])
+
+
+def close_tracks(args, tracks, progress, stats, error):
+    """
+    Close the output files of a run and finish its progress report. The warnings stored in error are repeated after
+    stdout output.
+    :param args: argparse.Namespace as returned by get_args(), with input_file set to a single file
+    :param tracks: list of Track
+    :param progress: Progress/None
+    :param stats: RunStats/None
+    :param error: list of str
+    :return: None
+    """
+    if tracks[0].result is None:
         # No sequence in fasta file, corrupted
-        sys.stdout.write("WARNING! {} contains no sequence data.\n".format(input_file))
+        sys.stdout.write(f"WARNING! {args.input_file} contains no sequence data.\n")
         raise TypeError
-    elif records_num == 1 or one_file:
-        result = open_results_file()
-        # one sequence in fasta file or one output file for all sequences
-        for record in SeqIO.parse(input_file, "fasta"):
-            write_title()
-            generate_result()
-        result.close()
-    else:
-        seq_num = 0
-        for record in SeqIO.parse(input_file, "fasta"):
-            seq_num += 1
-            result = open_results_files()
-            write_title()
-            generate_result()
-            result.close()
-    if output_file is None:
+    if stats is not None:
+        stats.switch("write")
+    for track in tracks:
+        close_results_file(track)
+    if progress is not None:
+        progress.report(done=True)
+    if args.output_file is None:
         for err in error:
             sys.stderr.write(err)
+
+
+def run(args):
+    """
+    Calculate the GC content of one input file and write the results, as set by the command-line arguments.
+    :param args: argparse.Namespace as returned by get_args(), with input_file set to a single file
+    :return: dict, statistics of the run as returned by RunStats.report(), or None without --stats/--stats_file
+    """
+    if args.regions:
+        open_cache(args)
+        return run_regions(args)
+    stats = RunStats(args.input_file) if args.stats or args.stats_file else None
+    error = []  # Store generated error message, and write to stderr at the end of stdout output
+    # Cached records are written while they are looked up, so they cannot be calculated ahead of the output
+    pipeline = args.pipeline and not args.cache_dir
+    tracks = make_tracks(args, track_formats(args, error), pipeline, stats)
+
+    # The number of sequences decides between one output file and one file per sequence. It is known in advance from
+    # a GC index, a .fai index or from the scan needed by --jobs; otherwise the file is read once and the first output
+    # file is renamed when a second sequence turns up.
+    gc_index, entries = load_entries(args, scan=args.jobs > 1 or bool(args.region))
+    progress = make_progress(args, tracks, entries)
+    stream, lengths = stream_lengths(args, tracks, gc_index, entries)
+    cache = open_cache(args, gc_index, stream)
+    records, records_num, handle = record_source(args, gc_index, entries, pipeline, stats)
+    records = record_windows(records, args, gc_index, stream, lengths, cache=cache, tracks=tracks, stats=stats)
+    if stats is not None:
+        # The windows of each record are calculated in a background thread with --pipeline
+        records = stats.timed_records(records)
+    if pipeline:
+        records = pipeline_records(records)
+    if progress is not None:
+        progress.records_num = records_num
+    write_records(records, tracks, args.one_file or records_num == 1, records_num, entries, progress=progress,
+                  stats=stats)
+    if handle is not None:
+        handle.close()
+    if cache is not None:
+        cache.close()
+    close_tracks(args, tracks, progress, stats, error)
+    if stats is None:
+        return None
+    report = stats.report(tracks)
+    if args.stats:
+        sys.stderr.write(format_stats(report))
+    return report
+
+
+def batch_worker(args):
+    """
+    Process one input file of a batch. Errors are caught so that one bad file does not stop the others. The output
+    files are written to a temporary directory in the output directory and only moved into place when the input file
+    is done, so that a file that fails leaves no partial output behind.
+    :param args: argparse.Namespace for this input file
+    :return: str, error message, or None on success, and dict, statistics of the run as returned by run()
+    """
+    output_dir, name = os.path.split(args.output_file)
+    work_dir = tempfile.mkdtemp(prefix=f".{name}.", dir=output_dir)
+    args.output_file = os.path.join(work_dir, name)
+    try:
+        report = run(args)
+        for output in os.listdir(work_dir):
+            os.replace(os.path.join(work_dir, output), os.path.join(output_dir, output))
+        return None, report
+    except TypeError:
+        return f"{args.input_file} contains no sequence data.", None
+    except Exception as err:  # pylint: disable=broad-except
+        return f"{args.input_file}: {err}", None
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_batch(args):
+    """
+    Process several input files, args.jobs of them at a time in worker processes. Each input file is written to its
+    own output in the output directory, named by output_name(), and each file is calculated by a single process.
+    Input files that fail are reported and their partial output is removed (see batch_worker()).
+    The heartbeat file (--heartbeat) of each input file is named after it in the same way.
+    :param args: argparse.Namespace as returned by get_args()
+    :return: int, number of input files that failed
+    """
+    os.makedirs(args.output_file, exist_ok=True)
+    batch = []
+    for input_file in args.input_files:
+        file_args = ap.Namespace(**vars(args))
+        file_args.input_file = input_file
+        file_args.output_file = os.path.join(args.output_file, output_name(input_file))
+        file_args.jobs = 1
+        if args.heartbeat:
+            # One heartbeat file per input file, HEARTBEAT_NAME.json for HEARTBEAT.json
+            root, extension = os.path.splitext(args.heartbeat)
+            file_args.heartbeat = f"{root}_{output_name(input_file)}{extension}"
+        batch.append(file_args)
+    if args.jobs > 1:
+        with ProcessPoolExecutor(args.jobs) as pool:
+            results = list(pool.map(batch_worker, batch))
+    else:
+        results = [batch_worker(file_args) for file_args in batch]
+    errors = [err for err, _ in results if err is not None]
+    for err in errors:
+        sys.stderr.write(f"ERROR! {err}\n")
+    if args.stats_file:
+        write_stats(args.stats_file, {"files": [report for _, report in results if report is not None]})
+    return len(errors)
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+    :param argv: list of str, command-line arguments (default: sys.argv[1:])
+    :return: None
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["index"]:
+        index_args = get_index_args(argv[1:])
+        for input_file in index_args.input_files:
+            write_gc_index(input_file, index_args.threads)
+        return
+    args = get_args(argv)
+    if args.batch:
+        if run_batch(args):
+            sys.exit(1)
+    else:
+        report = run(args)
+        if args.stats_file:
+            write_stats(args.stats_file, report)
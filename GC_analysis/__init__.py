@@ -13,3 +13,9 @@
 """
 
 name = "GC_analysis"
+
+from .compute import (Composition, composition_prefix, compute_gc, encode_sequence, gc_prefix, multi_stream_gc,
+                      multi_window_gc, stream_gc, window_gc, window_metric)
+from .readers import fasta_gc, open_fasta
+from .index import load_gc_index, write_gc_index
+from .GC_analysis import main
@@ -0,0 +1,356 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Counting the bases of a sequence and calculating the GC percentage and the other metrics of its windows.
+"""
+
+import itertools
+from collections import namedtuple
+import numpy as np
+
+GC_CODES = (ord("C"), ord("G"))
+METRICS = ("gc", "n", "softmask", "skew", "cpg")  # Tracks that can be calculated from the same scan of a sequence
+WINDOW_BLOCK = 1 << 20  # Windows calculated at a time by multi_window_gc()
+
+# Classes of bases counted by composition_prefix(), as bits of BASE_CLASSES
+G_UPPER, C_UPPER, G_LOWER, C_LOWER, ANY_N, LOWERCASE = 1, 2, 4, 8, 16, 32
+BASE_CLASSES = np.zeros(256, dtype=np.uint8)
+BASE_CLASSES[ord("G")], BASE_CLASSES[ord("C")] = G_UPPER, C_UPPER
+BASE_CLASSES[ord("g")], BASE_CLASSES[ord("c")] = G_LOWER | LOWERCASE, C_LOWER | LOWERCASE
+BASE_CLASSES[ord("N")] = ANY_N
+BASE_CLASSES[list(range(ord("a"), ord("z") + 1))] |= LOWERCASE
+BASE_CLASSES[ord("n")] |= ANY_N
+# Cumulative counts needed by each metric
+METRIC_FIELDS = {"gc": ("gc",), "n": ("n",), "softmask": ("lower",), "skew": ("g", "c"), "cpg": ("g", "c", "cpg")}
+# Metrics and the handling of soft-masked bases and N of a run. The default is the GC percentage of upper-case G and C
+# over the whole window, rounded to a whole percentage unless fraction is set.
+Composition = namedtuple("Composition", ["metrics", "ignore_case", "exclude_n", "fraction"], defaults=(False,))
+DEFAULT_COMPOSITION = Composition(("gc",), False, False)
+
+
+def encode_sequence(seq):
+    """
+    Encode a sequence as an array of ASCII byte codes without copying it more than once.
+    :param seq: str, bytes, Bio.Seq.Seq or Bio.SeqRecord.SeqRecord
+    :return: numpy.ndarray of uint8
+    """
+    if hasattr(seq, "seq"):
+        # A SeqRecord
+        seq = seq.seq
+    if isinstance(seq, str):
+        seq = seq.encode("ascii")
+    elif not isinstance(seq, (bytes, bytearray, memoryview)):
+        seq = bytes(seq)
+    return np.frombuffer(seq, dtype=np.uint8)
+
+
+def gc_prefix(codes):
+    """
+    Build the cumulative count of G and C bases of an encoded sequence. Element k of the returned array is the number
+    of G and C bases in codes[:k], so the count of any slice [start, end) is prefix[end] - prefix[start].
+    :param codes: numpy.ndarray of uint8 as returned by encode_sequence()
+    :return: numpy.ndarray of uint32 (uint64 for sequences of 4 Gbp or more)
+    """
+    return cumulative_count((codes == GC_CODES[0]) | (codes == GC_CODES[1]))
+
+
+def cumulative_count(mask):
+    """
+    Build the cumulative count of a boolean array, with a leading 0 as in gc_prefix().
+    :param mask: numpy.ndarray of bool
+    :return: numpy.ndarray of uint32 (uint64 for arrays of 2 ** 32 elements or more)
+    """
+    dtype = np.uint32 if len(mask) < 2 ** 32 else np.uint64
+    prefix = np.zeros(len(mask) + 1, dtype=dtype)
+    np.cumsum(mask, dtype=dtype, out=prefix[1:])
+    return prefix
+
+
+def composition_prefix(codes, metrics=("gc",), ignore_case=False, exclude_n=False, fraction=False):
+    """
+    Build the cumulative counts needed by several metrics (see METRICS) from a single classification of the bases
+    with BASE_CLASSES. For the default GC percentage this is gc_prefix().
+    :param codes: numpy.ndarray of uint8 as returned by encode_sequence()
+    :param metrics: iterable of str, metrics to be calculated by window_metric()
+    :param ignore_case: Bool, count lower-case (soft-masked) g and c as G and C
+    :param exclude_n: Bool, leave N out of the length of the windows in the GC percentage
+    :param fraction: Bool, have window_metric() return unrounded fractions instead of whole percentages
+    :return: numpy.ndarray as returned by gc_prefix() or CompositionPrefix
+    """
+    metrics = tuple(metrics)
+    if metrics == ("gc",) and not ignore_case and not exclude_n and not fraction:
+        return gc_prefix(codes)
+    fields = {field for metric in metrics for field in METRIC_FIELDS[metric]}
+    if exclude_n and "gc" in metrics:
+        fields.add("n")
+    if {"g", "c"} <= fields:
+        # The G+C count is the sum of the G and C counts
+        fields.discard("gc")
+    classes = BASE_CLASSES[codes]
+    g_bits = G_UPPER | G_LOWER if ignore_case else G_UPPER
+    c_bits = C_UPPER | C_LOWER if ignore_case else C_UPPER
+    masks = {"gc": lambda: classes & (g_bits | c_bits) != 0, "g": lambda: classes & g_bits != 0,
+             "c": lambda: classes & c_bits != 0, "n": lambda: classes & ANY_N != 0,
+             "lower": lambda: classes & LOWERCASE != 0}
+    counts = {}
+    for field in fields - {"cpg"}:
+        counts[field] = cumulative_count(masks[field]())
+    if "cpg" in fields:
+        # CpG dinucleotides, counted at the position of the C
+        pairs = np.zeros(len(codes), dtype=bool)
+        np.logical_and(classes[:-1] & c_bits, classes[1:] & g_bits, out=pairs[:-1])
+        counts["cpg"] = cumulative_count(pairs)
+    return CompositionPrefix(counts, exclude_n, fraction)
+
+
+class CompositionPrefix:
+    """
+    Cumulative counts of several classes of bases ("gc", "g", "c", "n", "lower" and "cpg"), as built by
+    composition_prefix(). Like IndexPrefix, it can be used in place of a gc_prefix() array, and a slice is the
+    CompositionPrefix of the same part of the sequence.
+    """
+
+    def __init__(self, counts, exclude_n=False, fraction=False):
+        self.counts = counts
+        self.exclude_n = exclude_n
+        self.fraction = fraction
+
+    def __len__(self):
+        return len(next(iter(self.counts.values())))
+
+    def count(self, positions, field="gc"):
+        """
+        Get the cumulative count of a class of bases at some positions.
+        :param positions: numpy.ndarray of int
+        :param field: str
+        :return: numpy.ndarray
+        """
+        if field == "gc" and field not in self.counts:
+            return self.counts["g"][positions] + self.counts["c"][positions]
+        return self.counts[field][positions]
+
+    def __getitem__(self, positions):
+        if isinstance(positions, slice):
+            return CompositionPrefix({field: counts[positions] for field, counts in self.counts.items()},
+                                     self.exclude_n, self.fraction)
+        return self.count(positions)
+
+
+def window_count(seq_len, window_size, shift, omit_tail=False):
+    """
+    Count the windows of a sequence, including the trailing window unless omit_tail is set.
+    :param seq_len: int, length of the sequence
+    :param window_size: int
+    :param shift: int
+    :param omit_tail: Bool
+    :return: int
+    """
+    windows = max((seq_len - window_size + shift) // shift, 0)
+    if windows * shift < seq_len and not omit_tail:
+        windows += 1
+    return windows
+
+
+def window_starts(seq_len, window_size, shift, omit_tail=False):
+    """
+    Calculate the 0-based start of every window, including the trailing window unless omit_tail is set.
+    :param seq_len: int, length of the sequence
+    :param window_size: int
+    :param shift: int
+    :param omit_tail: Bool
+    :return: numpy.ndarray of int64
+    """
+    return np.arange(window_count(seq_len, window_size, shift, omit_tail), dtype=np.int64) * shift
+
+
+def window_gc(prefix, window_size, shift, omit_tail=False):
+    """
+    Calculate the GC percentage of every window from a cumulative GC count. The percentages are rounded exactly like
+    int(round(count / float(window_size) * 100)), and the trailing window is divided by its own length.
+    :param prefix: numpy.ndarray as returned by gc_prefix()
+    :param window_size: int
+    :param shift: int
+    :param omit_tail: Bool
+    :return: numpy.ndarray of int64 (window starts), numpy.ndarray of uint8 (GC percentages)
+    """
+    starts = window_starts(len(prefix) - 1, window_size, shift, omit_tail)
+    return starts, window_values(prefix, "gc", starts, window_size)
+
+
+def window_values(prefix, metric, starts, window_size):
+    """
+    Calculate a metric of some windows of a sequence, as window_metric() does for all of them.
+    :param prefix: numpy.ndarray as returned by gc_prefix(), IndexPrefix (gc only) or CompositionPrefix
+    :param metric: str, one of METRICS
+    :param starts: numpy.ndarray of int64, 0-based window starts
+    :param window_size: int
+    :return: numpy.ndarray of uint8 (percentages) or float64 (skew, cpg and fractions)
+    """
+    ends = np.minimum(starts + window_size, len(prefix) - 1)
+    if metric == "gc" and not getattr(prefix, "exclude_n", False) and not getattr(prefix, "fraction", False):
+        counts = prefix[ends] - prefix[starts]
+        return np.rint(counts / (ends - starts).astype(np.float64) * 100).astype(np.uint8)
+    return interval_metric(prefix, metric, starts, ends)
+
+
+def multi_window_gc(prefix, resolutions, omit_tail=False, offset=0, metrics=("gc",)):
+    """
+    Calculate the GC percentage of every window for several window sizes and shifts from the same cumulative GC count,
+    so the sequence is only encoded once. With several metrics, every metric is calculated for every window size and
+    shift from the counts of composition_prefix(), and the tracks are numbered metric by metric. The windows of each
+    track are calculated in blocks of WINDOW_BLOCK windows, so the temporary arrays do not grow with the sequence.
+    :param prefix: numpy.ndarray as returned by gc_prefix(), or CompositionPrefix
+    :param resolutions: list of (int, int), window size and shift pairs
+    :param omit_tail: Bool
+    :param offset: int, added to the window starts (position of the sequence in a longer one)
+    :param metrics: iterable of str, see window_metric()
+    :return: generator of int (index in resolutions, or in the metric and resolution pairs), numpy.ndarray of int64
+    (window starts), numpy.ndarray of uint8 (GC percentages)
+    """
+    seq_len = len(prefix) - 1
+    for index, (metric, (window_size, shift)) in enumerate(itertools.product(metrics, resolutions)):
+        windows = window_count(seq_len, window_size, shift, omit_tail)
+        # An empty sequence still gets one (empty) block per track
+        for first in range(0, max(windows, 1), WINDOW_BLOCK):
+            starts = np.arange(first, min(first + WINDOW_BLOCK, windows), dtype=np.int64) * shift
+            yield index, starts + offset, window_values(prefix, metric, starts, window_size)
+
+
+def window_metric(prefix, metric, window_size, shift, omit_tail=False):
+    """
+    Calculate a metric of every window from the cumulative counts of composition_prefix():
+    gc, the GC percentage, divided by the number of bases other than N if the prefix was built with exclude_n;
+    n and softmask, the percentage of N and of lower-case bases; skew, the GC skew (G - C) / (G + C); and cpg, the CpG
+    observed/expected ratio CpG * length / (C * G). The percentages are rounded like window_gc(), or given as
+    unrounded fractions from 0 to 1 if the prefix was built with fraction, and windows where a ratio is undefined
+    (e.g. only N, or no C or G) get 0.
+    :param prefix: numpy.ndarray as returned by gc_prefix(), or CompositionPrefix
+    :param metric: str, one of METRICS
+    :param window_size: int
+    :param shift: int
+    :param omit_tail: Bool
+    :return: numpy.ndarray of int64 (window starts), numpy.ndarray of uint8 (percentages) or float64 (skew, cpg and
+    fractions)
+    """
+    starts = window_starts(len(prefix) - 1, window_size, shift, omit_tail)
+    return starts, window_values(prefix, metric, starts, window_size)
+
+
+def interval_metric(prefix, metric, starts, ends):
+    """
+    Calculate a metric of arbitrary intervals of a sequence, as window_metric() does for windows. Empty intervals get
+    0.
+    :param prefix: numpy.ndarray as returned by gc_prefix(), IndexPrefix (gc only) or CompositionPrefix
+    :param metric: str, one of METRICS
+    :param starts: numpy.ndarray of int64, 0-based starts
+    :param ends: numpy.ndarray of int64, ends (exclusive), at most the length of the sequence
+    :return: numpy.ndarray of uint8 (percentages) or float64 (skew, cpg and fractions)
+    """
+    lengths = (ends - starts).astype(np.float64)
+    fraction = getattr(prefix, "fraction", False)
+
+    def count(field, last=ends):
+        if field == "gc" and not hasattr(prefix, "exclude_n"):
+            # An array or IndexPrefix, which only have the G+C count
+            return (prefix[last] - prefix[starts]).astype(np.float64)
+        return (prefix.count(last, field) - prefix.count(starts, field)).astype(np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if metric in ("gc", "n", "softmask"):
+            if metric == "gc":
+                valid = lengths - count("n") if getattr(prefix, "exclude_n", False) else lengths
+                values = np.nan_to_num(count("gc") / valid)
+            else:
+                values = np.nan_to_num(count("n" if metric == "n" else "lower") / lengths)
+            if not fraction:
+                values = np.rint(values * 100).astype(np.uint8)
+        elif metric == "skew":
+            g_count, c_count = count("g"), count("c")
+            values = np.nan_to_num((g_count - c_count) / (g_count + c_count))
+        else:
+            # A CpG at the last base of an interval would end outside of it
+            pairs = count("cpg", np.maximum(ends - 1, starts))
+            values = np.nan_to_num(pairs * lengths / (count("c") * count("g")), posinf=0.0)
+    return values
+
+
+def stream_gc(chunks, window_size, shift, omit_tail=False):
+    """
+    Calculate the GC percentage of every window of a sequence given as consecutive chunks. Only the bases that are still
+    needed by the next window are kept between chunks, so memory use does not depend on the length of the sequence.
+    The windows are identical to those of compute_gc().
+    :param chunks: iterable of bytes (or str), consecutive pieces of one sequence
+    :param window_size: int
+    :param shift: int
+    :param omit_tail: Bool
+    :return: generator of numpy.ndarray of int64 (window starts), numpy.ndarray of uint8 (GC percentages)
+    """
+    for _, starts, percents in multi_stream_gc(chunks, [(window_size, shift)], omit_tail):
+        yield starts, percents
+
+
+def multi_stream_gc(chunks, resolutions, omit_tail=False, composition=DEFAULT_COMPOSITION, offset=0):
+    """
+    stream_gc() for several window sizes and shifts at once. Each chunk is encoded and counted once for all of them;
+    the bases kept between chunks are those still needed by the window size and shift that is furthest behind.
+    :param chunks: iterable of bytes (or str), consecutive pieces of one sequence
+    :param resolutions: list of (int, int), window size and shift pairs
+    :param omit_tail: Bool
+    :param composition: Composition, metrics numbered as in multi_window_gc()
+    :param offset: int, added to the window starts (position of the sequence in a longer one)
+    :return: generator of int (index in resolutions, or in the metric and resolution pairs), numpy.ndarray of int64
+    (window starts), numpy.ndarray of uint8 (GC percentages)
+    """
+    tracks = list(itertools.product(composition.metrics, resolutions))
+    carry = np.empty(0, dtype=np.uint8)  # Bases from the earliest next window start onwards
+    position = 0  # Position of carry[0] in the sequence
+    next_starts = [0] * len(tracks)  # Start of the next window of each track
+    for chunk in chunks:
+        codes = encode_sequence(chunk)
+        if len(carry):
+            codes = np.concatenate((carry, codes))
+        end = position + len(codes)
+        prefix = composition_prefix(codes, *composition)
+        for index, (metric, (window_size, shift)) in enumerate(tracks):
+            start = next_starts[index]
+            if start + window_size > end:
+                continue
+            starts, percents = window_metric(prefix[start - position:], metric, window_size, shift, omit_tail=True)
+            yield index, starts + start + offset, percents
+            next_starts[index] = start + len(starts) * shift
+        # Windows may start after the end of the chunk when shift > window_size
+        cut = min(*next_starts, end)
+        carry = codes[cut - position:].copy()
+        position = cut
+    if not omit_tail:
+        for index, (metric, (window_size, shift)) in enumerate(tracks):
+            start = next_starts[index]
+            if start < position + len(carry):
+                # Trailing sequence shorter than one window
+                starts, percents = window_metric(composition_prefix(carry[start - position:], *composition), metric,
+                                                 window_size, shift)
+                yield index, starts + start + offset, percents
+
+
+def compute_gc(seq, window_size, shift, omit_tail=False):
+    """
+    Calculate the GC percentage of every window of a sequence.
+    :param seq: str, bytes, Bio.Seq.Seq or Bio.SeqRecord.SeqRecord
+    :param window_size: int
+    :param shift: int
+    :param omit_tail: Bool
+    :return: numpy.ndarray of int64 (window starts), numpy.ndarray of uint8 (GC percentages)
+    """
+    return window_gc(gc_prefix(encode_sequence(seq)), window_size, shift, omit_tail)
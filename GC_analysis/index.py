@@ -0,0 +1,399 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+The GC index (.gci) of a FASTA file, and the on-disk cache of the results of whole records.
+"""
+
+import codecs
+import contextlib
+import functools
+import os
+import struct
+import sys
+import hashlib
+import json
+from collections import namedtuple
+import numpy as np
+
+from .compute import DEFAULT_COMPOSITION, GC_CODES, encode_sequence, multi_stream_gc, window_starts
+from .readers import CHUNK_SIZE, compression_type, open_fasta, parse_region, split_sequence, stream_records
+
+GCI_MAGIC = b"GCINDEX1"  # First and last bytes of a GC index (.gci) file
+GCI_BLOCK = 64  # Bases per GC index block
+VALID_BASES = np.zeros(256, dtype=bool)  # A, C, G and T in either case
+VALID_BASES[list(b"ACGTacgt")] = True
+POPCOUNT8 = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+# Record of a GC index. offset is the position of its first block in the index file.
+GCIndexEntry = namedtuple("GCIndexEntry", ["name", "length", "description", "offset"])
+
+CACHE_VERSION = 2  # Part of every result cache key, to be increased when the cached results change
+
+
+def popcount64(words):
+    """
+    Count the set bits of every element of an array of 64-bit words.
+    :param words: numpy.ndarray of uint64
+    :return: numpy.ndarray of int64
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).astype(np.int64)
+    return POPCOUNT8[np.ascontiguousarray(words).view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.int64)
+
+
+def index_blocks(codes, gc_total, valid_total, dtype):
+    """
+    Pack a multiple of GCI_BLOCK bases into GC index blocks: the G+C and valid base counts before each block and one bit
+    per base of the block.
+    :param codes: numpy.ndarray of uint8 as returned by encode_sequence(), a multiple of GCI_BLOCK long
+    :param gc_total: int, G+C bases before codes
+    :param valid_total: int, valid bases before codes
+    :param dtype: numpy.dtype of the blocks (gci_dtype())
+    :return: numpy.ndarray of dtype, int (G+C bases up to the end of codes), int (valid bases up to the end of codes)
+    """
+    blocks = np.empty(len(codes) // GCI_BLOCK, dtype=dtype)
+    totals = {"gc": gc_total, "valid": valid_total}
+    if len(blocks):
+        for field, bases in (("gc", (codes == GC_CODES[0]) | (codes == GC_CODES[1])), ("valid", VALID_BASES[codes])):
+            bits = np.packbits(bases, bitorder="little").view("<u8")
+            counts = np.cumsum(popcount64(bits))
+            blocks[field + "_bits"] = bits
+            blocks[field][0] = totals[field]
+            blocks[field][1:] = totals[field] + counts[:-1]
+            totals[field] += int(counts[-1])
+    return blocks, totals["gc"], totals["valid"]
+
+
+def gci_dtype(count_type):
+    """
+    Layout of a GC index block.
+    :param count_type: str, "<u4" or "<u8", type of the counts
+    :return: numpy.dtype
+    """
+    return np.dtype([("gc", count_type), ("valid", count_type), ("gc_bits", "<u8"), ("valid_bits", "<u8")])
+
+
+def write_gc_index(input_file, threads=1, chunk_size=CHUNK_SIZE):
+    """
+    Write the GC index (.gci) of a FASTA file next to it. For every record, the index holds one block per GCI_BLOCK
+    bases (and one more for the end of the record) with the number of G+C bases and of valid (A, C, G, T) bases before
+    the block and a bit per base of the block, so the count of any slice is two lookups and a bit count. The file
+    starts with GCI_MAGIC and ends with the JSON description of the records, its offset and GCI_MAGIC again.
+    :param input_file: str, name of the FASTA file
+    :param threads: int, number of threads used to decompress a BGZF file
+    :param chunk_size: int, number of bytes read at a time
+    :return: str, name of the index file
+    """
+    stat = os.stat(input_file)
+    # Counts of a record cannot exceed the size of a plain file
+    count_type = "<u4" if stat.st_size < 2 ** 32 and compression_type(input_file) is None else "<u8"
+    dtype = gci_dtype(count_type)
+    index_file = input_file + ".gci"
+    records = []
+    with open_fasta(input_file, threads) as handle, open(index_file + ".tmp", "wb") as index:
+        index.write(GCI_MAGIC)
+        for record_id, description, chunks in stream_records(handle, chunk_size):
+            offset = index.tell()
+            carry = np.empty(0, dtype=np.uint8)
+            gc_total = valid_total = length = 0
+            for chunk in chunks:
+                codes = encode_sequence(chunk)
+                length += len(codes)
+                if len(carry):
+                    codes = np.concatenate((carry, codes))
+                full = len(codes) - len(codes) % GCI_BLOCK
+                blocks, gc_total, valid_total = index_blocks(codes[:full], gc_total, valid_total, dtype)
+                index.write(blocks.tobytes())
+                carry = codes[full:].copy()
+            # The last block holds the trailing bases (possibly none), padded with bases that are not counted
+            codes = np.zeros(GCI_BLOCK, dtype=np.uint8)
+            codes[:len(carry)] = carry
+            blocks, _, _ = index_blocks(codes, gc_total, valid_total, dtype)
+            index.write(blocks.tobytes())
+            records.append({"name": record_id, "description": description, "length": length, "offset": offset})
+        metadata = json.dumps({"version": 1, "block": GCI_BLOCK, "count_type": count_type,
+                               "fasta_size": stat.st_size, "fasta_mtime_ns": stat.st_mtime_ns,
+                               "records": records}).encode()
+        metadata_offset = index.tell()
+        index.write(metadata)
+        index.write(struct.pack("<Q", metadata_offset) + GCI_MAGIC)
+    os.replace(index_file + ".tmp", index_file)
+    return index_file
+
+
+class GCIndex:
+    """
+    Memory-mapped GC index (.gci) written by write_gc_index(). entries lists the records in input order.
+    """
+
+    def __init__(self, index_file):
+        self._map = np.memmap(index_file, dtype=np.uint8, mode="r")
+        if len(self._map) < 2 * len(GCI_MAGIC) + 8 or bytes(self._map[-len(GCI_MAGIC):]) != GCI_MAGIC:
+            raise ValueError(f"{index_file} is not a GC index")
+        metadata_offset = struct.unpack("<Q", bytes(self._map[-8 - len(GCI_MAGIC):-len(GCI_MAGIC)]))[0]
+        self.metadata = json.loads(bytes(self._map[metadata_offset:-8 - len(GCI_MAGIC)]).decode())
+        self._dtype = gci_dtype(self.metadata["count_type"])
+        self.entries = [GCIndexEntry(record["name"], record["length"], record["description"], record["offset"])
+                        for record in self.metadata["records"]]
+
+    def is_current(self, input_file):
+        """
+        Check that the index was written for the current version of the FASTA file.
+        :param input_file: str, name of the FASTA file
+        :return: Bool
+        """
+        stat = os.stat(input_file)
+        return (self.metadata["fasta_size"], self.metadata["fasta_mtime_ns"]) == (stat.st_size, stat.st_mtime_ns)
+
+    def prefix(self, entry, start=0, end=None):
+        """
+        Get the cumulative G+C count of a record, or of the part [start, end) of it.
+        :param entry: GCIndexEntry
+        :param start: int, 0-based start
+        :param end: int/None, end (exclusive), the end of the record by default
+        :return: IndexPrefix
+        """
+        blocks = np.ndarray((entry.length // GCI_BLOCK + 1,), dtype=self._dtype, buffer=self._map,
+                            offset=entry.offset)
+        return IndexPrefix(blocks, start, entry.length if end is None else end)
+
+
+class IndexPrefix:
+    """
+    Cumulative G+C count read from a GC index, used by window_gc() in place of the array returned by gc_prefix():
+    element k is the number of G and C bases among the first k bases, and indexing with an array of positions only
+    reads the blocks of those positions.
+    """
+
+    def __init__(self, blocks, start, end):
+        self._blocks = blocks
+        self._start = start
+        self._end = end
+
+    def __len__(self):
+        return self._end - self._start + 1
+
+    def count(self, positions, field="gc"):
+        """
+        Count the G+C (field "gc") or valid (field "valid") bases before positions of the record.
+        :param positions: numpy.ndarray of int64, positions in the record
+        :param field: str, "gc" or "valid"
+        :return: numpy.ndarray of int64
+        """
+        blocks = positions // GCI_BLOCK
+        masks = (np.uint64(1) << (positions % GCI_BLOCK).astype(np.uint64)) - np.uint64(1)
+        return (self._blocks[field][blocks].astype(np.int64) +
+                popcount64(self._blocks[field + "_bits"][blocks] & masks))
+
+    def __getitem__(self, positions):
+        positions = np.asarray(positions, dtype=np.int64).ravel()
+        counts = np.empty(len(positions), dtype=np.int64)
+        before = self.count(np.array([self._start], dtype=np.int64))[0]
+        # A block of positions at a time keeps the temporary arrays small
+        for block in range(0, len(positions), CHUNK_SIZE):
+            counts[block:block + CHUNK_SIZE] = self.count(positions[block:block + CHUNK_SIZE] + self._start) - before
+        return counts
+
+
+def load_gc_index(input_file):
+    """
+    Open the GC index next to a FASTA file, if there is one that was written for the current version of the file.
+    :param input_file: str, name of the FASTA file
+    :return: GCIndex, or None if there is no usable index
+    """
+    index_file = input_file + ".gci"
+    if not os.path.isfile(index_file):
+        return None
+    gc_index = GCIndex(index_file)
+    if not gc_index.is_current(input_file):
+        sys.stderr.write(f"WARNING! {index_file} is older than {input_file} and was not used.\n")
+        return None
+    return gc_index
+
+
+def index_records(gc_index, regions=None):
+    """
+    Get the cumulative G+C count of every record, or of every region, from a GC index.
+    :param gc_index: GCIndex
+    :param regions: list of str/None, samtools-style regions
+    :return: generator of GCIndexEntry, int (0-based start), IndexPrefix
+    """
+    if regions:
+        names = {entry.name: entry for entry in gc_index.entries}
+        for entry, start, end in [parse_region(region, names) for region in regions]:
+            yield entry, start, gc_index.prefix(entry, start, end)
+    else:
+        for entry in gc_index.entries:
+            yield entry, 0, gc_index.prefix(entry)
+
+
+class TeeWriter:
+    """
+    Output file of a wiggle, bedGraph or gzip track that also writes its lines, as bytes, to a cache file. fileobj is
+    that of the output file, so that count_output() still finds the compressed size of gzip output.
+    """
+
+    def __init__(self, result, store):
+        self.result = result
+        self.store = store
+        self.fileobj = getattr(result, "fileobj", None)
+
+    def write(self, data):
+        """
+        Write data to the output file and to the cache file.
+        :param data: str (wiggle and bedGraph) or bytes (gzip)
+        :return: int, as the write() of the output file
+        """
+        self.store.write(data.encode("utf-8") if isinstance(data, str) else data)
+        return self.result.write(data)
+
+
+class ResultCache:
+    """
+    On-disk cache of the results of whole records, keyed by the SHA-256 digest of the sequence, the sequence
+    identifier, the track settings and the composition settings of the run. Wiggle and gzip tracks store the rendered
+    lines of the record, so a hit is copied to the output without calculating or formatting anything; bigwig and npy
+    tracks store the values as a .npy file. The least recently used files are removed when the cache is closed and holds
+    more than max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes, composition=DEFAULT_COMPOSITION):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.composition = composition
+
+    def path(self, track, record_id, digest, omit_tail):
+        """
+        Get the cache file of a record of a track.
+        :param track: Track
+        :param record_id: str, sequence identifier (written in fixedStep lines)
+        :param digest: str, hex digest of the sequence
+        :param omit_tail: Bool
+        :return: str
+        """
+        options = track.options
+        text = options.output_format not in ("bigwig", "npy")
+        key = json.dumps([CACHE_VERSION, digest, record_id, options.window_size, options.shift, omit_tail,
+                          text and options.fixed_step, options.metric, self.composition.ignore_case,
+                          self.composition.exclude_n, options.output_format == "bedgraph", self.composition.fraction])
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + (".txt" if text else ".npy"))
+
+    def copy_text(self, track, path):
+        """
+        Copy the stored lines of a record to the output of a wiggle, bedGraph or gzip track, CHUNK_SIZE bytes at a
+        time. Text output is decoded incrementally, as a multi-byte character can be split between two reads.
+        :param track: Track
+        :param path: str, cache file as returned by path()
+        :return: None
+        """
+        decoder = None if track.options.output_format == "gzip" else codecs.getincrementaldecoder("utf-8")()
+        with open(path, "rb") as cached:
+            for data in iter(functools.partial(cached.read, CHUNK_SIZE), b""):
+                if decoder is None:
+                    track.result.write(data)
+                else:
+                    track.result.write(decoder.decode(data))
+                    track.written += len(data)
+        if decoder is not None:
+            decoder.decode(b"", final=True)
+
+    def record_blocks(self, tracks, record_id, seq, omit_tail):
+        """
+        Calculate a record like multi_stream_gc() for the tracks that are not in the cache, and store their results.
+        Wiggle and gzip tracks found in the cache are written to their output directly, and bigwig and npy tracks found
+        in the cache are returned from the stored percentages.
+        :param tracks: list of Track, in the order of multi_window_gc()
+        :param record_id: str, sequence identifier
+        :param seq: bytes, the whole sequence
+        :param omit_tail: Bool
+        :return: generator of int (index in tracks), numpy.ndarray of int64 (window starts), numpy.ndarray of uint8
+        (GC percentages)
+        """
+        digest = hashlib.sha256(seq).hexdigest()
+        missing = {}  # Cache file of each track to calculate
+        for index, track in enumerate(tracks):
+            path = self.path(track, record_id, digest, omit_tail)
+            if os.path.isfile(path):
+                os.utime(path)  # Most recently used
+                if path.endswith(".txt"):
+                    self.copy_text(track, path)
+                else:
+                    starts = window_starts(len(seq), track.options.window_size, track.options.shift, omit_tail)
+                    yield index, starts, np.load(path)
+            else:
+                missing[index] = path
+        if missing:
+            yield from self.store_blocks(tracks, missing, seq, omit_tail)
+
+    def store_blocks(self, tracks, missing, seq, omit_tail):
+        """
+        Calculate a record for the tracks that are not in the cache (see record_blocks()) and store their results. The
+        tracks are calculated together in one pass over the sequence, CHUNK_SIZE bases at a time.
+        :param tracks: list of Track, in the order of multi_window_gc()
+        :param missing: dict of int (index in tracks) to str (cache file, as returned by path())
+        :param seq: bytes, the whole sequence
+        :param omit_tail: Bool
+        :return: generator of blocks, as record_blocks()
+        """
+        # The tracks are numbered metric by metric, so the first metric's tracks hold all the resolutions
+        resolutions = [(track.options.window_size, track.options.shift)
+                       for track in tracks[:len(tracks) // len(self.composition.metrics)]]
+        values = {index: [] for index, path in missing.items() if path.endswith(".npy")}
+        with contextlib.ExitStack() as stack:
+            # Several processes (batch mode) can share the cache, so each writes its own temporary file
+            stores = {index: stack.enter_context(open(f"{path}.{os.getpid()}.tmp", "wb"))
+                      for index, path in missing.items()}
+            for index in missing:
+                if index not in values:
+                    # The lines written to the output while the record is calculated are stored as well
+                    stack.callback(setattr, tracks[index], "result", tracks[index].result)
+                    tracks[index].result = TeeWriter(tracks[index].result, stores[index])
+            for index, starts, percents in multi_stream_gc(split_sequence(seq), resolutions, omit_tail,
+                                                           self.composition):
+                if index in missing:
+                    yield index, starts, percents
+                    if index in values:
+                        values[index].append(percents)
+            for index in missing:
+                if index in values:
+                    np.save(stores[index], np.concatenate(values[index]))
+                elif tracks[index].flush is not None:
+                    tracks[index].flush()
+        for index, path in missing.items():
+            os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+    def close(self):
+        """
+        Remove the least recently used files until the cache holds at most max_bytes.
+        :return: None
+        """
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith((".txt", ".npy")):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Removed by another process
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
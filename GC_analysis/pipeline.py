@@ -0,0 +1,273 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Calculating records in worker processes, and overlapping reading, calculating and writing in threads.
+"""
+
+import queue
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+
+from .compute import (DEFAULT_COMPOSITION, composition_prefix, encode_sequence, multi_stream_gc, window_metric,
+                      window_starts)
+from .readers import (CHUNK_SIZE, WHITESPACE, compression_type, fetch_sequence, open_fasta, split_sequence,
+                      stream_records)
+
+PIPELINE_DEPTH = 4  # Blocks of windows calculated ahead of the output with --pipeline
+
+
+def record_worker(input_file, entry, resolutions, omit_tail, *, composition=DEFAULT_COMPOSITION, seq=None):
+    """
+    Calculate the GC percentages of one record in a worker process. Unless seq is given, the record is read from the
+    file by the worker itself so that sequences are not sent between processes.
+    :param input_file: str, name of the FASTA file
+    :param entry: FastaEntry
+    :param resolutions: list of (int, int), window size and shift pairs
+    :param omit_tail: Bool
+    :param composition: Composition
+    :param seq: bytes/None, sequence of the record, already read by the caller
+    :return: list of numpy.ndarray of uint8 (GC percentages of each metric, window size and shift)
+    """
+    if seq is None:
+        with open_fasta(input_file) as handle:
+            seq = fetch_sequence(handle, entry)
+    results = [[] for _ in range(len(composition.metrics) * len(resolutions))]
+    for index, _, percents in multi_stream_gc(split_sequence(seq), resolutions, omit_tail, composition):
+        results[index].append(percents)
+    return [np.concatenate(blocks) for blocks in results]
+
+
+def read_sequences(input_file):
+    """
+    Read the sequence of every record of a FASTA file in one pass.
+    :param input_file: str, name of the FASTA file
+    :return: generator of bytes
+    """
+    with open_fasta(input_file) as handle:
+        for _, _, chunks in stream_records(handle):
+            yield b"".join(chunks)
+
+
+def parallel_results(input_file, entries, jobs, resolutions, omit_tail, *, composition=DEFAULT_COMPOSITION):
+    """
+    Calculate the GC percentages of many records with a pool of worker processes. Among the next 2 * jobs records that
+    have not been written yet, the largest are submitted first, and the results are returned in input order. At most
+    2 * jobs finished or running results are held at any time. A plain gzip file can only be read from the start, so
+    each worker seeking to its own record would decompress the file again and again; its records are read in one
+    pass by this process instead and sent to the workers in input order.
+    :param input_file: str, name of the FASTA file
+    :param entries: list of FastaEntry as returned by scan_fasta()
+    :param jobs: int, number of worker processes
+    :param resolutions: list of (int, int), window size and shift pairs
+    :param omit_tail: Bool
+    :param composition: Composition
+    :return: generator of FastaEntry, list of int (index in resolutions, or in the metric and resolution pairs),
+    numpy.ndarray of int64 (window starts), numpy.ndarray of uint8 (GC percentages)
+    """
+    max_pending = 2 * jobs
+    futures = {}
+    sequences = read_sequences(input_file) if compression_type(input_file) == "gzip" else None
+    with ProcessPoolExecutor(jobs) as pool:
+        for index, entry in enumerate(entries):
+            waiting = [i for i in range(index, min(index + max_pending, len(entries))) if i not in futures]
+            if sequences is None:
+                for i in sorted(waiting, key=lambda i: entries[i].length, reverse=True):
+                    futures[i] = pool.submit(record_worker, input_file, entries[i], resolutions, omit_tail,
+                                             composition=composition)
+            else:
+                # waiting comes first, so that no sequence is read beyond the last waiting record
+                for i, seq in zip(waiting, sequences):
+                    futures[i] = pool.submit(record_worker, input_file, entries[i], resolutions, omit_tail,
+                                             composition=composition, seq=seq)
+            yield entry, [(track, window_starts(entry.length, window_size, shift, omit_tail), percents)
+                          for track, ((_, (window_size, shift)), percents)
+                          in enumerate(zip(itertools.product(composition.metrics, resolutions),
+                                           futures.pop(index).result()))]
+
+
+def chunk_worker(shm_name, seq_len, start, end, *, window_size, shift, omit_tail, composition=DEFAULT_COMPOSITION,
+                 metric="gc"):
+    """
+    Calculate the GC percentages of the windows starting in [start, end) of a sequence held in shared memory. The
+    slice read includes a halo of window_size - shift bases after end so that the last windows are complete.
+    :param shm_name: str, name of the shared memory block holding the encoded sequence
+    :param seq_len: int, length of the sequence
+    :param start: int, first window start of the chunk (a multiple of shift)
+    :param end: int, end of the chunk (a multiple of shift, or seq_len for the last chunk)
+    :param window_size: int
+    :param shift: int
+    :param omit_tail: Bool, only used by the last chunk
+    :param composition: Composition
+    :param metric: str, the metric of composition that is calculated
+    :return: numpy.ndarray of uint8 (GC percentages)
+    """
+    composition = composition._replace(metrics=(metric,))
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        codes = np.ndarray((seq_len,), dtype=np.uint8, buffer=shm.buf)
+        if end == seq_len:
+            percents = window_metric(composition_prefix(codes[start:], *composition), metric, window_size, shift,
+                                     omit_tail)[1]
+        else:
+            percents = window_metric(composition_prefix(codes[start:end - shift + window_size], *composition), metric,
+                                     window_size, shift, True)[1]
+        del codes
+    finally:
+        shm.close()
+    return percents
+
+
+def split_chunks(seq_len, window_size, shift, split_size):
+    """
+    Split a sequence into contiguous chunks whose boundaries are multiples of shift. Every chunk is at least one
+    window long, so the halo read after a chunk never reaches past seq_len.
+    :param seq_len: int
+    :param window_size: int
+    :param shift: int
+    :param split_size: int, approximate chunk length (raised to the window size when smaller)
+    :return: list of (int, int)
+    """
+    step = -(-max(split_size, window_size, 1) // shift) * shift
+    bounds = list(range(0, seq_len, step)) + [seq_len]
+    if len(bounds) > 2 and seq_len - bounds[-2] < window_size:
+        del bounds[-2]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def split_results(input_file, entry, jobs, resolutions, omit_tail, *, split_size=None,
+                  composition=DEFAULT_COMPOSITION):
+    """
+    Calculate the GC percentages of one record with a pool of worker processes. The record is encoded once into
+    shared memory and split into chunks with split_chunks() for each window size and shift; the results are returned
+    chunk by chunk in order and are identical to compute_gc().
+    :param input_file: str, name of the FASTA file
+    :param entry: FastaEntry as returned by scan_fasta()
+    :param jobs: int, number of worker processes
+    :param resolutions: list of (int, int), window size and shift pairs
+    :param omit_tail: Bool
+    :param split_size: int/None, chunk length (default: a quarter of the record per worker, at least CHUNK_SIZE)
+    :param composition: Composition
+    :return: generator of int (index in resolutions, or in the metric and resolution pairs), numpy.ndarray of int64
+    (window starts), numpy.ndarray of uint8 (GC percentages)
+    """
+    if entry.length == 0:
+        return
+    split_size = split_size or max(-(-entry.length // (4 * jobs)), CHUNK_SIZE)
+    shm = shared_memory.SharedMemory(create=True, size=entry.length)
+    try:
+        codes = np.ndarray((entry.length,), dtype=np.uint8, buffer=shm.buf)
+        filled = 0
+        with open_fasta(input_file) as handle:
+            handle.seek(entry.offset)
+            while filled < entry.length:
+                block = handle.read(min(CHUNK_SIZE, entry.end - handle.tell())).translate(None, WHITESPACE)
+                codes[filled:filled + len(block)] = encode_sequence(block)
+                filled += len(block)
+        del codes
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = [(index, shift, start, pool.submit(chunk_worker, shm.name, entry.length, start, end,
+                                                         window_size=window_size, shift=shift, omit_tail=omit_tail,
+                                                         composition=composition, metric=metric))
+                       for index, (metric, (window_size, shift))
+                       in enumerate(itertools.product(composition.metrics, resolutions))
+                       for start, end in split_chunks(entry.length, window_size, shift, split_size)]
+            for index, shift, start, future in futures:
+                percents = future.result()
+                yield index, start + np.arange(len(percents), dtype=np.int64) * shift, percents
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def pipelined(iterable, depth=PIPELINE_DEPTH):
+    """
+    Iterate over an iterable in a background thread that runs at most depth items ahead of the caller. Exceptions
+    raised by the iterable are raised again in the caller, and the thread is stopped when the generator is closed.
+    :param iterable: iterable, not used by the caller in the meantime
+    :param depth: int, maximum number of items waiting in the queue
+    :return: generator
+    """
+    items = queue.Queue(depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fill():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as err:
+            put((None, err))
+            return
+        put(done)
+
+    thread = threading.Thread(target=fill, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if item[1] is not None:
+                raise item[1]
+            yield item[0]
+    finally:
+        stop.set()
+        thread.join()
+
+
+def pipeline_records(records, depth=PIPELINE_DEPTH):
+    """
+    Calculate records in a background thread (see pipelined()) while the caller writes them. The last item of each
+    record is an iterable of blocks of windows, which are passed on one at a time through the same queue, so the
+    calculation runs at most depth blocks ahead of the output. As with stream_records(), the blocks of a record must
+    be consumed before moving on to the next record.
+    :param records: iterable of tuples, the last item of which is an iterable of blocks
+    :param depth: int, maximum number of records and blocks waiting in the queue
+    :return: generator of tuples, the last item of which is a generator of blocks
+    """
+    end = object()
+
+    def flatten():
+        for record in records:
+            yield record[:-1]
+            yield from record[-1]
+            yield end
+
+    items = pipelined(flatten(), depth)
+
+    def blocks():
+        for block in items:
+            if block is end:
+                return
+            yield block
+
+    try:
+        for record in items:
+            yield record + (blocks(),)
+    finally:
+        items.close()
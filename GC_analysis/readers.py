@@ -0,0 +1,714 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Reading FASTA files (plain, gzip, BGZF or standard input), their samtools .fai indexes, regions and BED
+intervals, and expanding the names of the input files.
+"""
+
+import bisect
+import glob
+import io
+import os
+import queue
+import struct
+import sys
+import gzip
+import itertools
+import threading
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from .compute import stream_gc
+
+CHUNK_SIZE = 1 << 20  # Bytes read from the input file at a time in streaming mode
+STDIN = "-"  # Input file name that reads the FASTA file from standard input
+WHITESPACE = b" \t\n\r\v\f"  # Removed from sequence lines
+
+# Location of a record in a FASTA file. offset and end delimit the bytes of the sequence lines, line_bases and
+# line_width describe the first sequence line as in a samtools .fai index. line_bases is 0 when the lines hold
+# whitespace other than line breaks, as positions cannot be converted to file offsets then.
+FastaEntry = namedtuple("FastaEntry", ["name", "length", "offset", "line_bases", "line_width", "description", "end"])
+
+
+def compression_type(input_file):
+    """
+    Tell plain, gzip and BGZF (bgzip) compressed files apart from their first bytes.
+    :param input_file: str, name of the file
+    :return: None, "gzip" or "bgzf"
+    """
+    with open(input_file, "rb") as handle:
+        header = handle.read(18)
+    if header[:2] != b"\x1f\x8b":
+        return None
+    if len(header) == 18 and header[3] & 4 and header[12:14] == b"BC":
+        return "bgzf"
+    return "gzip"
+
+
+def open_fasta(input_file, threads=1, prefetch=False):
+    """
+    Open a FASTA file for binary reading. gzip compressed files are decompressed by a background thread while the
+    sequence is being processed, and BGZF files by a pool of threads. Offsets (tell/seek) are always positions in the
+    uncompressed file, like the offsets of a samtools .fai index. STDIN opens standard input, which can only be read
+    forwards; gzip and BGZF compressed input is recognised from its first bytes and decompressed as a gzip stream.
+    :param input_file: str, name of the FASTA file, or STDIN
+    :param threads: int, number of threads used to decompress BGZF files
+    :param prefetch: Bool, also read plain files ahead in a background thread (--pipeline)
+    :return: binary file object
+    """
+    if input_file == STDIN:
+        stdin = sys.stdin.buffer
+        if stdin.peek(2)[:2] == b"\x1f\x8b":  # pylint: disable=no-member
+            return io.BufferedReader(PrefetchReader(gzip.open(stdin, "rb")), CHUNK_SIZE)
+        return stdin
+    compression = compression_type(input_file)
+    if compression == "bgzf":
+        return io.BufferedReader(BgzfReader(input_file, threads), CHUNK_SIZE)
+    if compression == "gzip":
+        return io.BufferedReader(PrefetchReader(gzip.open(input_file, "rb")), CHUNK_SIZE)
+    if prefetch:
+        return io.BufferedReader(PrefetchReader(open(input_file, "rb", buffering=0)), CHUNK_SIZE)
+    return open(input_file, "rb")
+
+
+class PrefetchReader(io.RawIOBase):
+    """
+    Read-only file object that reads ahead from another file object in a background thread, so that gzip
+    decompression (which releases the GIL) and slow reads run alongside the calculation. Seeking is passed on to the
+    wrapped file.
+    """
+
+    def __init__(self, raw, depth=4):
+        super().__init__()
+        self._raw = raw
+        self._queue = queue.Queue(depth)  # Replaced by an empty queue of the same depth whenever the thread starts
+        self._stop = None
+        self._thread = None
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self._pos = raw.tell()
+
+    def _start(self):
+        self._queue = queue.Queue(self._queue.maxsize)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, args=(self._queue, self._stop), daemon=True)
+        self._thread.start()
+
+    def _fill(self, chunks, stop):
+        while not stop.is_set():
+            try:
+                data = self._raw.read(CHUNK_SIZE)
+            except (OSError, EOFError, zlib.error) as err:
+                data = err
+            while not stop.is_set():
+                try:
+                    chunks.put(data, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if not isinstance(data, bytes) or not data:
+                return
+
+    def _halt(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        if not self._buffer:
+            if self._eof:
+                return 0
+            if self._thread is None:
+                self._start()
+            data = self._queue.get()
+            if not isinstance(data, bytes):
+                raise data
+            if not data:
+                self._eof = True
+                self._halt()
+                return 0
+            self._buffer = memoryview(data)
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        self._pos += size
+        return size
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._halt()
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self._pos = self._raw.seek(offset if whence == io.SEEK_SET else self._pos + offset)
+        return self._pos
+
+    def close(self):
+        self._halt()
+        self._raw.close()
+        super().close()
+
+
+class BgzfReader(io.RawIOBase):
+    """
+    Read-only, seekable file object for BGZF (bgzip) files. The blocks are located with the .gzi index next to the
+    file, or by reading the block headers, and are decompressed by a pool of threads ahead of the reader.
+    """
+
+    def __init__(self, input_file, threads=1):
+        super().__init__()
+        self._raw = open(input_file, "rb")  # pylint: disable=consider-using-with
+        self._raw.seek(0, io.SEEK_END)
+        size = self._raw.tell()
+        blocks = read_gzi(input_file) or scan_bgzf_blocks(self._raw)
+        self._coffsets = [block[0] for block in blocks] + [size]
+        self._uoffsets = [block[1] for block in blocks]
+        self._pool = ThreadPoolExecutor(max(threads, 1))
+        self._ahead = 2 * max(threads, 1)
+        self._futures = {}  # Decompressed blocks, from the one being read up to _ahead blocks ahead of it
+        self._pos = 0
+
+    def _read_block(self, block):
+        return os.pread(self._raw.fileno(), self._coffsets[block + 1] - self._coffsets[block], self._coffsets[block])
+
+    def _load(self, block):
+        for ahead in range(block, min(block + self._ahead, len(self._uoffsets))):
+            if ahead not in self._futures:
+                self._futures[ahead] = self._pool.submit(zlib.decompress, self._read_block(ahead), 31)
+        for stale in [key for key in self._futures if key < block]:
+            del self._futures[stale]
+        return self._futures[block].result()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        block = bisect.bisect_right(self._uoffsets, self._pos) - 1
+        while block < len(self._uoffsets):
+            data = self._load(block)
+            start = self._pos - self._uoffsets[block]
+            if start < len(data):
+                size = min(len(b), len(data) - start)
+                b[:size] = data[start:start + size]
+                self._pos += size
+                return size
+            block += 1
+        return 0
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._pos = offset if whence == io.SEEK_SET else self._pos + offset
+        return self._pos
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self._raw.close()
+        super().close()
+
+
+def read_gzi(input_file):
+    """
+    Read the block index (.gzi) of a BGZF file written by bgzip -i or samtools faidx, if it is not older than the file.
+    :param input_file: str, name of the BGZF file
+    :return: list of (int, int), compressed and uncompressed offset of every block, or None
+    """
+    gzi_file = input_file + ".gzi"
+    if not os.path.isfile(gzi_file) or os.path.getmtime(gzi_file) < os.path.getmtime(input_file):
+        return None
+    with open(gzi_file, "rb") as gzi:
+        count = struct.unpack("<Q", gzi.read(8))[0]
+        offsets = struct.unpack(f"<{2 * count}Q", gzi.read(16 * count))
+    return [(0, 0)] + list(zip(offsets[::2], offsets[1::2]))
+
+
+def scan_bgzf_blocks(handle):
+    """
+    Locate the blocks of a BGZF file from their headers (BSIZE) and trailers (ISIZE) without decompressing them.
+    :param handle: binary file object of the BGZF file
+    :return: list of (int, int), compressed and uncompressed offset of every block
+    """
+    blocks = []
+    coffset = uoffset = 0
+    while True:
+        handle.seek(coffset)
+        header = handle.read(12)
+        if len(header) < 12:
+            return blocks
+        extra = handle.read(struct.unpack("<H", header[10:12])[0])
+        bsize = None
+        pos = 0
+        while pos + 4 <= len(extra):
+            length = struct.unpack("<H", extra[pos + 2:pos + 4])[0]
+            if extra[pos:pos + 2] == b"BC":
+                bsize = struct.unpack("<H", extra[pos + 4:pos + 6])[0]
+            pos += 4 + length
+        if bsize is None:
+            raise ValueError(f"{handle.name} is not a BGZF file")
+        handle.seek(coffset + bsize - 3)
+        isize = struct.unpack("<I", handle.read(4))[0]
+        blocks.append((coffset, uoffset))
+        coffset += bsize + 1
+        uoffset += isize
+
+
+def read_fasta_chunks(handle, chunk_size=CHUNK_SIZE):
+    """
+    Read a FASTA file in fixed-size blocks and split it into sequence chunks without line breaks. Headers are handled
+    like Bio.SeqIO's FASTA parser, and all whitespace (WHITESPACE) is removed from the sequence lines, as SeqIO does
+    with spaces and trailing whitespace; every record yields at least one (possibly empty) chunk.
+    :param handle: binary file object
+    :param chunk_size: int, number of bytes read at a time
+    :return: generator of int (ordinal number of the record, from 0), str (header), bytes (sequence chunk)
+    """
+    index = -1
+    description = None
+    emitted = True
+    at_line_start = True
+    pending = b""
+    while True:
+        block = handle.read(chunk_size)
+        if not block:
+            break
+        if pending:
+            block = pending + block
+            pending = b""
+        pos = 0
+        while pos < len(block):
+            if at_line_start and block[pos:pos + 1] == b">":
+                eol = block.find(b"\n", pos)
+                if eol < 0:
+                    # Header continues in the next block
+                    pending = block[pos:]
+                    break
+                if not emitted:
+                    yield index, description, b""
+                index += 1
+                description = block[pos + 1:eol].decode().rstrip()
+                emitted = False
+                pos = eol + 1
+                continue
+            header = block.find(b"\n>", pos)
+            end = len(block) if header < 0 else header + 1
+            at_line_start = block[end - 1:end] == b"\n"
+            seq = block[pos:end].translate(None, WHITESPACE)
+            if seq and index >= 0:
+                yield index, description, seq
+                emitted = True
+            pos = end
+    if pending:
+        # Header on the last line of the file
+        if not emitted:
+            yield index, description, b""
+        index += 1
+        description = pending[1:].decode().rstrip()
+        emitted = False
+    if not emitted:
+        yield index, description, b""
+
+
+def record_name(description):
+    """
+    Get the sequence identifier from a FASTA header the same way as Bio.SeqIO, i.e. the first word.
+    :param description: str, FASTA header without the leading ">"
+    :return: str
+    """
+    return description.split(None, 1)[0] if description else ""
+
+
+def stream_records(handle, chunk_size=CHUNK_SIZE):
+    """
+    Group the chunks of read_fasta_chunks() by record. The chunks of a record must be consumed before moving on to the
+    next record.
+    :param handle: binary file object
+    :param chunk_size: int, number of bytes read at a time
+    :return: generator of str (identifier), str (header), iterator of bytes (sequence chunks)
+    """
+    for (_, description), group in itertools.groupby(read_fasta_chunks(handle, chunk_size), key=lambda item: item[:2]):
+        yield record_name(description), description, (chunk for _, _, chunk in group)
+
+
+def split_sequence(seq, chunk_size=CHUNK_SIZE):
+    """
+    Split a sequence that is already in memory into chunks, to be calculated like a streamed record without copying.
+    :param seq: bytes
+    :param chunk_size: int
+    :return: generator of memoryview
+    """
+    view = memoryview(seq)
+    for start in range(0, len(seq), chunk_size):
+        yield view[start:start + chunk_size]
+
+
+def fasta_gc(fasta, window_size, shift, omit_tail=False, *, chunk_size=CHUNK_SIZE, threads=1):
+    """
+    Calculate the GC percentage of every window of every record of a FASTA file. The file is read in chunks and the
+    windows are produced block by block, so memory use does not depend on the length of the sequences.
+    :param fasta: str (name of a plain, gzip or BGZF compressed FASTA file) or binary file object
+    :param window_size: int
+    :param shift: int
+    :param omit_tail: Bool
+    :param chunk_size: int, number of bytes read at a time
+    :param threads: int, number of threads used to decompress a BGZF file
+    :return: generator of str (identifier), str (header), generator of numpy.ndarray of int64 (window starts),
+    numpy.ndarray of uint8 (GC percentages). The blocks of a record must be consumed before moving on to the next
+    record.
+    """
+    if isinstance(fasta, (str, os.PathLike)):
+        with open_fasta(os.fspath(fasta), threads) as handle:
+            yield from fasta_gc(handle, window_size, shift, omit_tail, chunk_size=chunk_size)
+        return
+    for record_id, description, chunks in stream_records(fasta, chunk_size):
+        yield record_id, description, stream_gc(chunks, window_size, shift, omit_tail)
+
+
+def fasta_lengths(input_file, chunk_size=CHUNK_SIZE):
+    """
+    Measure the length of every sequence in a FASTA file without keeping the sequences in memory.
+    :param input_file: str, name of the FASTA file
+    :param chunk_size: int, number of bytes read at a time
+    :return: list of int
+    """
+    with open_fasta(input_file) as handle:
+        return [sum(len(chunk) for chunk in chunks) for _, _, chunks in stream_records(handle, chunk_size)]
+
+
+def count_bases(block, start, end):
+    """
+    Count the bases in part of a block of sequence lines, i.e. the bytes that are not whitespace, and tell whether any
+    of the whitespace is not a line break.
+    :param block: bytes
+    :param start: int
+    :param end: int
+    :return: int (bases), Bool (whitespace other than line breaks)
+    """
+    part = block[start:end]
+    bases = len(part.translate(None, WHITESPACE))
+    return bases, end - start - bases != part.count(b"\n") + part.count(b"\r")
+
+
+def scan_fasta(input_file):
+    """
+    Locate every record of a FASTA file in one pass without keeping the sequences in memory. Only the scan state (the
+    header being read, the first sequence line, the bases counted so far and whether the lines hold whitespace other
+    than line breaks) is carried from one block to the next.
+    :param input_file: str, name of the FASTA file
+    :return: list of FastaEntry
+    """
+    entries = []
+    header = None
+    parts = None  # Pieces of a header line that is not complete yet
+    first = None  # Bytes and bases of a first sequence line that is not complete yet
+    line_bases = line_width = length = offset = 0
+    spaced = False
+    block_pos = 0  # Position of block[0] in the file
+    at_line_start = True
+    with open_fasta(input_file) as handle:
+        for block in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            i = 0
+            while i < len(block):
+                if parts is not None:
+                    eol = block.find(b"\n", i)
+                    parts.append(block[i:] if eol < 0 else block[i:eol])
+                    if eol < 0:
+                        break
+                    header = b"".join(parts).decode().rstrip()
+                    parts = None
+                    offset = block_pos + eol + 1
+                    first = [0, 0]
+                    length = 0
+                    spaced = False
+                    i = eol + 1
+                    continue
+                if at_line_start and block[i] == 62:  # ">"
+                    if first is not None:
+                        line_width, line_bases = first if first[1] else (0, 0)
+                        first = None
+                    if header is not None:
+                        entries.append(FastaEntry(record_name(header), length, offset, 0 if spaced else line_bases,
+                                                  line_width, header, block_pos + i))
+                    parts = []
+                    i += 1
+                    continue
+                end = block.find(b"\n>", i)
+                end = len(block) if end < 0 else end + 1
+                bases, inner = count_bases(block, i, end)
+                if first is not None:
+                    eol = block.find(b"\n", i, end)
+                    stop = end if eol < 0 else eol + 1
+                    first[0] += stop - i
+                    first[1] += count_bases(block, i, stop)[0]
+                    if eol >= 0:
+                        line_width, line_bases = first if first[1] else (0, 0)
+                        first = None
+                # Bases before the first header are dropped when length is reset by the header
+                length += bases
+                spaced = spaced or inner
+                at_line_start = block[end - 1] == 10  # "\n"
+                i = end
+            block_pos += len(block)
+    if parts is not None:
+        header = b"".join(parts).decode().rstrip()
+        offset = block_pos
+        first = [0, 0]
+        length = 0
+        spaced = False
+    if first is not None:
+        line_width, line_bases = first if first[1] else (0, 0)
+    if header is not None:
+        entries.append(FastaEntry(record_name(header), length, offset, 0 if spaced else line_bases, line_width, header,
+                                  block_pos))
+    return entries
+
+
+def read_header(handle, offset):
+    """
+    Read the FASTA header that ends just before a sequence offset.
+    :param handle: binary file object of the FASTA file
+    :param offset: int, byte offset of the first base of the sequence
+    :return: str, header without the leading ">"
+    """
+    size = 1024
+    while True:
+        start = max(0, offset - size)
+        handle.seek(start)
+        block = handle.read(offset - start)
+        header = block.rfind(b"\n>")
+        if header >= 0:
+            return block[header + 2:].decode().rstrip()
+        if start == 0:
+            return block[1:].decode().rstrip()
+        size *= 4
+
+
+def load_fai(input_file):
+    """
+    Read the samtools .fai index of a FASTA file, if there is one that is not older than the FASTA file. The headers,
+    which are not part of the index, are read from the FASTA file.
+    :param input_file: str, name of the FASTA file
+    :return: list of FastaEntry, or None if there is no usable index
+    """
+    fai_file = input_file + ".fai"
+    if not os.path.isfile(fai_file) or os.path.getmtime(fai_file) < os.path.getmtime(input_file):
+        return None
+    entries = []
+    with open(fai_file, encoding="utf-8") as fai, open_fasta(input_file) as handle:
+        for line in fai:
+            fields = line.rstrip("\r\n").split("\t")
+            if len(fields) < 5:
+                continue
+            length, offset, line_bases, line_width = (int(field) for field in fields[1:5])
+            end = offset + (length // line_bases) * line_width + length % line_bases if line_bases else offset
+            entries.append(FastaEntry(fields[0], length, offset, line_bases, line_width, read_header(handle, offset),
+                                      end))
+    return entries
+
+
+def write_fai(input_file, entries):
+    """
+    Save entries from scan_fasta() as a samtools .fai index next to the FASTA file, so that later runs can use it.
+    Nothing is written if a sequence has lines of different lengths (samtools refuses such files) or the directory is
+    not writable.
+    :param input_file: str, name of the FASTA file
+    :param entries: list of FastaEntry
+    :return: None
+    """
+    if not all(is_regular(entry) for entry in entries):
+        return
+    try:
+        with open(input_file + ".fai", "w", encoding="utf-8") as fai:
+            for entry in entries:
+                fai.write(f"{entry.name}\t{entry.length}\t{entry.offset}\t{entry.line_bases}\t{entry.line_width}\n")
+    except OSError:
+        pass
+
+
+def is_regular(entry):
+    """
+    Check whether the sequence lines of a record all have the length of the first line (except for the last line), so
+    that positions can be converted to file offsets.
+    :param entry: FastaEntry
+    :return: Bool
+    """
+    if entry.length == 0:
+        return True
+    if not entry.line_bases:
+        return False
+    expected = entry.offset + (entry.length // entry.line_bases) * entry.line_width + entry.length % entry.line_bases
+    return 0 <= entry.end - expected <= entry.line_width - entry.line_bases
+
+
+def fetch_region(handle, entry, start, end):
+    """
+    Read part of the sequence of a record. For records with regular lines, only the bytes of the region are read,
+    using the line length and width to skip the line breaks.
+    :param handle: binary file object of the FASTA file
+    :param entry: FastaEntry
+    :param start: int, 0-based start of the region
+    :param end: int, end of the region (exclusive)
+    :return: bytes
+    """
+    if end <= start:
+        return b""
+    if not is_regular(entry):
+        return fetch_sequence(handle, entry)[start:end]
+    first = entry.offset + (start // entry.line_bases) * entry.line_width + start % entry.line_bases
+    last = entry.offset + ((end - 1) // entry.line_bases) * entry.line_width + (end - 1) % entry.line_bases + 1
+    handle.seek(first)
+    return handle.read(last - first).translate(None, WHITESPACE)
+
+
+def parse_region(region, entries):
+    """
+    Parse a samtools-style region, "chrom", "chrom:start" or "chrom:start-end" with 1-based inclusive coordinates.
+    A sequence name that contains ":" is matched as a whole first.
+    :param region: str
+    :param entries: dict of str to FastaEntry
+    :return: FastaEntry, int (0-based start), int (exclusive end)
+    """
+    if region in entries:
+        return entries[region], 0, entries[region].length
+    name, _, interval = region.rpartition(":")
+    if name not in entries:
+        raise ValueError(f"Sequence {name or region} of region {region} is not in the input file")
+    entry = entries[name]
+    start, _, end = interval.replace(",", "").partition("-")
+    try:
+        start = int(start) - 1
+        end = min(int(end), entry.length) if end else entry.length
+    except ValueError as err:
+        raise ValueError(f"Invalid region {region}") from err
+    if start < 0 or start >= end:
+        raise ValueError(f"Invalid region {region}")
+    return entry, start, end
+
+
+def region_records(input_file, entries, regions):
+    """
+    Read the sequence of every region.
+    :param input_file: str, name of the FASTA file
+    :param entries: list of FastaEntry
+    :param regions: list of str, samtools-style regions
+    :return: generator of FastaEntry, int (0-based start), bytes (sequence of the region)
+    """
+    names = {entry.name: entry for entry in entries}
+    regions = [parse_region(region, names) for region in regions]
+    with open_fasta(input_file) as handle:
+        for entry, start, end in regions:
+            yield entry, start, fetch_region(handle, entry, start, end)
+
+
+def read_bed(bed_file):
+    """
+    Read the intervals of a BED file and group them by sequence, in the order in which the sequences first appear
+    and in file order within a sequence. Header lines ("track", "browser" and "#") and empty lines are skipped.
+    :param bed_file: str, name of the BED file
+    :return: dict of str (sequence name) to list of str (lines without line break), numpy.ndarray of int64 (0-based
+    starts), numpy.ndarray of int64 (exclusive ends)
+    """
+    groups = {}
+    with open(bed_file, encoding="utf-8") as bed:
+        for line_num, line in enumerate(bed, 1):
+            line = line.rstrip("\r\n")
+            if not line or line.startswith(("#", "track", "browser")):
+                continue
+            fields = line.split("\t", 3)
+            if len(fields) < 3:
+                fields = line.split(None, 3)
+            try:
+                start, end = int(fields[1]), int(fields[2])
+            except (IndexError, ValueError) as err:
+                raise ValueError(f"Invalid BED line {line_num} of {bed_file}: {line}") from err
+            if start < 0 or end < start:
+                raise ValueError(f"Invalid BED line {line_num} of {bed_file}: {line}")
+            group = groups.setdefault(fields[0], ([], [], []))
+            group[0].append(line)
+            group[1].append(start)
+            group[2].append(end)
+    return {chrom: (lines, np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64))
+            for chrom, (lines, starts, ends) in groups.items()}
+
+
+def fetch_sequence(handle, entry):
+    """
+    Read the sequence of a record located by scan_fasta().
+    :param handle: binary file object of the FASTA file
+    :param entry: FastaEntry
+    :return: bytes
+    """
+    handle.seek(entry.offset)
+    return handle.read(entry.end - entry.offset).translate(None, WHITESPACE)
+
+
+def is_pattern(name):
+    """
+    Tell whether an input file name is a glob pattern.
+    :param name: str
+    :return: Bool
+    """
+    return any(char in name for char in "*?[")
+
+
+def is_batch(input_files, manifest=None):
+    """
+    Tell whether the input files are processed in batch mode, from the form of the input and not from the number of
+    files it expands to: several -i values, a glob pattern or a manifest file. The output of a run then does not
+    change from a file to a directory depending on how many files happen to match.
+    :param input_files: list of str/None, values of "-i"
+    :param manifest: str/None, name of the manifest file
+    :return: Bool
+    """
+    input_files = input_files or []
+    return bool(manifest) or len(input_files) > 1 or any(is_pattern(name) for name in input_files)
+
+
+def parse_inputs(input_files, manifest=None):
+    """
+    Expand the input file names given with "-i" and listed in a manifest file (one per line; blank lines and lines
+    starting with "#" are skipped). Glob patterns are expanded in sorted order, and repeated files are only read once.
+    :param input_files: list of str/None, values of "-i"
+    :param manifest: str/None, name of the manifest file
+    :return: list of str
+    """
+    patterns = list(input_files or [])
+    if manifest:
+        with open(manifest, encoding="utf-8") as listing:
+            patterns.extend(line.strip() for line in listing if line.strip() and not line.lstrip().startswith("#"))
+    inputs = []
+    for pattern in patterns:
+        if is_pattern(pattern):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                raise ValueError(f"no input file matches {pattern}")
+            inputs.extend(matches)
+        else:
+            inputs.append(pattern)
+    if not inputs:
+        raise ValueError("the input file (-i or -m) is required")
+    return list(dict.fromkeys(inputs))
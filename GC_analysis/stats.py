@@ -0,0 +1,312 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Statistics (--stats) and progress reports (--progress) of a run.
+"""
+
+import os
+import sys
+import json
+import threading
+import time
+
+from .writers import WRITE_BLOCK, count_output
+
+
+def peak_rss(children=False):
+    """
+    Get the peak resident set size of this process, or of its largest finished child process. The resource module
+    only exists on Unix, so the peak memory use is not known on Windows.
+    :param children: Bool, measure the child processes instead of this one
+    :return: int, bytes, or None where it cannot be measured
+    """
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss << 10
+
+
+class RunStats:  # pylint: disable=too-many-instance-attributes
+    """
+    Time spent in each stage of a run ("--stats"), per record and in total: reading the FASTA file (read),
+    calculating the windows (compute) and formatting and writing them (write). Time that is not spent in a stage,
+    such as opening output files, is only counted in the total. The stages are switched around the iterators and
+    write_content functions of run(), so a disabled RunStats costs nothing. In streaming mode the windows are
+    calculated while the file is read, and reading the next chunk is counted as read time. Each thread has its own
+    current stage, so with --pipeline the stages overlap and their times add up to more than the total.
+    """
+
+    STAGES = ("read", "compute", "write")
+
+    def __init__(self, input_file):
+        self.input_file = input_file
+        self.records = []
+        self.times = dict.fromkeys(self.STAGES, 0.0)
+        self.windows = 0
+        self.local = threading.local()  # Current stage of each thread and the time it was switched to
+        self.lock = threading.Lock()
+        self.start = self.record_start = time.perf_counter()
+
+    def switch(self, stage):
+        """
+        Charge the time since the last switch of this thread to its current stage and make stage the current one.
+        :param stage: str or None
+        :return: str or None, the previous stage
+        """
+        now = time.perf_counter()
+        previous = getattr(self.local, "stage", None)
+        if previous is not None:
+            with self.lock:
+                self.times[previous] += now - self.local.last
+        self.local.last = now
+        self.local.stage = stage
+        return previous
+
+    def timed(self, iterable, stage, count=None):
+        """
+        Charge the time spent getting each item of an iterable to a stage.
+        :param iterable: iterable
+        :param stage: str
+        :param count: list of one int, to which the length of each item (a sequence chunk) is added
+        :return: generator
+        """
+        iterator = iter(iterable)
+        while True:
+            previous = self.switch(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.switch(previous)
+                return
+            self.switch(previous)
+            if count is not None:
+                count[0] += len(item)
+            yield item
+
+    def timed_records(self, records):
+        """
+        Charge the time spent calculating each record and its blocks of windows to the compute stage. Reading the
+        record, when it is timed as well, is still charged to the read stage.
+        :param records: iterable of records whose last item is an iterable of blocks of windows
+        :return: generator
+        """
+        for record in self.timed(records, "compute"):
+            yield record[:-1] + (self.timed(record[-1], "compute"),)
+
+    def timed_content(self, content):
+        """
+        Wrap a write_content function so that its time is charged to the write stage and its windows are counted.
+        :param content: function, as returned by generate_write_content()
+        :return: function
+        """
+        def timed(chrom, seq_len, starts, percents):
+            previous = self.switch("write")
+            content(chrom, seq_len, starts, percents)
+            self.switch(previous)
+            self.windows += len(starts)
+        return timed
+
+    def end_record(self, record_id, tracks, bases):
+        """
+        Store the statistics of a record, i.e. everything since the end of the previous record.
+        :param record_id: str, sequence identifier
+        :param tracks: list of Track, whose written counters are reset
+        :param bases: int, length of the record
+        :return: None
+        """
+        now = time.perf_counter()
+        record = {"record": record_id, "seconds": now - self.record_start}
+        with self.lock:
+            record.update(self.times)
+            self.times = dict.fromkeys(self.STAGES, 0.0)
+        for track in tracks:
+            count_output(track)
+        record.update({"bases": bases, "windows": self.windows,
+                       "bytes_written": sum(track.written for track in tracks)})
+        record["bp_per_second"] = record["bases"] / record["seconds"] if record["seconds"] else None
+        record["peak_rss_bytes"] = peak_rss()
+        self.records.append(record)
+        self.windows = 0
+        for track in tracks:
+            track.written = 0
+        self.record_start = now
+
+    def report(self, tracks=()):
+        """
+        Sum up the records. Time spent in a stage after the last record, such as closing the output files, and the
+        bytes written since then are only counted in the totals.
+        :param tracks: list of Track, whose output files are closed
+        :return: dict, JSON-serialisable statistics of the run with the list of records
+        """
+        self.switch(None)
+        seconds = time.perf_counter() - self.start
+        report = {"input_file": self.input_file, "seconds": seconds}
+        for key in self.STAGES:
+            report[key] = self.times[key] + sum(record[key] for record in self.records)
+        for key in ("bases", "windows", "bytes_written"):
+            report[key] = sum(record[key] for record in self.records)
+        report["bytes_written"] += sum(track.written for track in tracks)
+        report["bp_per_second"] = report["bases"] / seconds if seconds else None
+        report["peak_rss_bytes"] = peak_rss()
+        report["children_peak_rss_bytes"] = peak_rss(children=True)
+        report["records"] = self.records
+        return report
+
+
+def format_stats(report):
+    """
+    Render the totals of a run's statistics as one line for stderr.
+    :param report: dict, as returned by RunStats.report()
+    :return: str
+    """
+    rss = [value for value in (report["peak_rss_bytes"], report["children_peak_rss_bytes"]) if value is not None]
+    peak = f"{max(rss) / (1 << 20):.1f} MiB" if rss else "unknown"
+    return (f"STATS {report['input_file']}: {len(report['records'])} records, {report['bases']} bp, "
+            f"{report['windows']} windows in {report['seconds']:.3f} s ({report['bp_per_second'] or 0:.4g} bp/s); "
+            f"read {report['read']:.3f} s, compute {report['compute']:.3f} s, write {report['write']:.3f} s; "
+            f"{report['bytes_written']} bytes written; peak RSS {peak}\n")
+
+
+class Progress:  # pylint: disable=too-many-instance-attributes
+    """
+    Progress of a run ("--progress" and "--heartbeat"): the record being written, the bases done out of its length and
+    out of the length of the whole file when they are known, the throughput and the estimated time left. The
+    write_content functions of the tracks are wrapped so that the progress is updated every WRITE_BLOCK windows, but it
+    is only reported every interval seconds. The report is written to stderr and/or to a JSON heartbeat file, never to
+    stdout.
+    """
+
+    def __init__(self, input_file, interval=10.0, show=True, heartbeat=None, tracks=1):
+        self.input_file = input_file
+        self.interval = interval
+        self.show = show
+        self.heartbeat = heartbeat
+        self.tracks = tracks
+        self.records_num = None
+        self.total_bases = None
+        self.record_id = None
+        self.seq_num = 0
+        self.length = None
+        self.offset = 0
+        self.positions = [0] * tracks
+        self.bases_before = 0  # Bases of the finished records
+        self.windows = 0
+        self.start = time.monotonic()
+        self.next_report = self.start + interval
+
+    def start_record(self, record_id, seq_num, start=0, length=None):
+        """
+        Move on to the next record.
+        :param record_id: str, sequence identifier
+        :param seq_num: int, ordinal number of the record
+        :param start: int, 0-based position of the first window (of a region)
+        :param length: int, number of bases calculated, or None if it is not known yet (streaming mode)
+        :return: None
+        """
+        self.bases_before += self.bases_done() if self.length is None else self.length
+        self.record_id, self.seq_num, self.offset, self.length = record_id, seq_num, start, length
+        self.positions = [0] * self.tracks
+
+    def bases_done(self):
+        """
+        Get the bases of the current record done by all tracks, on average.
+        :return: int
+        """
+        return sum(self.positions) // self.tracks
+
+    def wrap(self, content, index, window_size):
+        """
+        Wrap the write_content function of a track so that the progress is updated every WRITE_BLOCK windows.
+        :param content: function, as returned by generate_write_content()
+        :param index: int, index of the track
+        :param window_size: int
+        :return: function
+        """
+        def content_with_progress(chrom, seq_len, starts, percents):
+            for block in range(0, len(starts), WRITE_BLOCK):
+                block_starts = starts[block:block + WRITE_BLOCK]
+                content(chrom, seq_len, block_starts, percents[block:block + WRITE_BLOCK])
+                end = int(block_starts[-1]) + window_size - self.offset
+                self.positions[index] = end if self.length is None else min(end, self.length)
+                self.windows += len(block_starts)
+                if time.monotonic() >= self.next_report:
+                    self.report()
+        return content_with_progress
+
+    def state(self, done=False):
+        """
+        Describe the progress.
+        :param done: Bool, the run has finished
+        :return: dict, JSON-serialisable
+        """
+        elapsed = time.monotonic() - self.start
+        bases = self.length if done and self.length is not None else self.bases_done()
+        total_done = self.bases_before + bases
+        rate = total_done / elapsed if elapsed else 0.0
+        # The time left for the whole file needs its length; otherwise only the time left for the record is known
+        scope = "run" if self.total_bases or done else "record"
+        if done:
+            eta = 0.0
+        elif self.total_bases and rate:
+            eta = max(self.total_bases - total_done, 0) / rate
+        elif self.length and rate:
+            eta = max(self.length - bases, 0) / rate
+        else:
+            eta = None
+        return {"input_file": self.input_file, "state": "done" if done else "running", "record": self.record_id,
+                "record_num": self.seq_num, "records": self.records_num, "bases_done": bases,
+                "record_length": self.length, "total_bases_done": total_done, "total_bases": self.total_bases,
+                "windows": self.windows, "windows_per_second": self.windows / elapsed if elapsed else 0.0,
+                "bp_per_second": rate, "elapsed_seconds": elapsed, "eta_seconds": eta, "eta_scope": scope,
+                "time": time.time()}
+
+    def report(self, done=False):
+        """
+        Report the progress on stderr and/or in the heartbeat file, and schedule the next report.
+        :param done: Bool, the run has finished
+        :return: None
+        """
+        state = self.state(done)
+        if self.show:
+            percent = f" ({100 * state['bases_done'] / self.length:.1f}%)" if self.length else ""
+            records_num = "?" if self.records_num is None else self.records_num
+            length = "?" if self.length is None else self.length
+            scope = "record " if state["eta_scope"] == "record" else ""
+            eta = "?" if state["eta_seconds"] is None else f"{state['eta_seconds']:.0f} s"
+            sys.stderr.write(f"PROGRESS {self.input_file}: record {self.seq_num}/{records_num} {self.record_id}: "
+                             f"{state['bases_done']}/{length} bp{percent}, {state['windows_per_second']:.4g} "
+                             f"windows/s, {scope}ETA {eta}\n")
+        if self.heartbeat:
+            # Replaced in one step, so that the file can be read at any time
+            temporary = f"{self.heartbeat}.{os.getpid()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as heartbeat:
+                json.dump(state, heartbeat)
+            os.replace(temporary, self.heartbeat)
+        self.next_report = time.monotonic() + self.interval
+
+
+def write_stats(stats_file, report):
+    """
+    Write the statistics of a run (--stats_file) as JSON.
+    :param stats_file: str, name of the JSON file
+    :param report: dict, as returned by RunStats.report(), or {"files": [...]} with one of them per input file
+    :return: None
+    """
+    with open(stats_file, "w", encoding="utf-8") as stats:
+        json.dump(report, stats, indent=1)
+        stats.write("\n")
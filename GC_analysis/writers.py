@@ -0,0 +1,538 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Output files of the tracks (wiggle, bigwig, gzip, bedGraph and npy) and the formatting of the windows.
+"""
+
+import os
+import struct
+import sys
+import gzip
+import json
+import zlib
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+try:
+    import pyBigWig
+except ImportError:
+    # Only needed to write bigwig output
+    pyBigWig = None
+
+from .readers import CHUNK_SIZE
+
+WRITE_BLOCK = 1 << 16  # Windows written to the output file at a time
+PERCENT_LINES = [f"{percent}\n" for percent in range(101)]  # fixedStep data lines
+EXTENSIONS = {"wiggle": ".wig", "gzip": ".wig.gz", "bigwig": ".bw", "bedgraph": ".bedGraph", "npy": ".npy"}
+NPY_HEADER = 128  # Bytes of the header of npy output, rewritten with the number of windows when the file is closed
+TRACK_NAMES = {"gc": "GC percentage", "n": "N percentage", "softmask": "Soft-masked percentage", "skew": "GC skew",
+               "cpg": "CpG observed/expected"}
+VALUE_FORMATS = {"skew": "%.4f", "cpg": "%.4f"}  # Text format of the metrics that are not whole percentages
+# Settings of a track. With pipeline set, gzip output is compressed on a background thread even with one thread. With
+# fraction set, npy output is float32.
+TrackOptions = namedtuple("TrackOptions", ["window_size", "shift", "output_format", "output_file", "fixed_step",
+                                           "compress_level", "threads", "metric", "pipeline", "merge", "fraction"],
+                          defaults=("wiggle", None, False, 9, 1, "gc", False, False, False))
+
+
+class GzipBlockWriter:
+    """
+    Write-only binary file object that compresses its input in blocks of CHUNK_SIZE bytes on a pool of threads, like
+    pigz. Each block is an independent gzip member, so the file is a standard multi-member gzip file that gzip, zcat
+    and Python's gzip module read as one stream. The members are written in order and at most 2 * threads blocks are
+    held in memory. As with gzip.GzipFile, fileobj is the underlying file, whose position is the number of compressed
+    bytes written so far.
+    """
+
+    def __init__(self, filename, compress_level=9, threads=1):
+        self.fileobj = open(filename, "wb")  # pylint: disable=consider-using-with
+        self._level = compress_level
+        self._pool = ThreadPoolExecutor(threads)
+        self._ahead = 2 * threads
+        self._pending = deque()
+        self._buffer = []
+        self._size = 0
+
+    def _compress(self, data):
+        compressor = zlib.compressobj(self._level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def _submit(self):
+        self._pending.append(self._pool.submit(self._compress, b"".join(self._buffer)))
+        self._buffer = []
+        self._size = 0
+        while len(self._pending) > self._ahead:
+            self.fileobj.write(self._pending.popleft().result())
+
+    def write(self, data):
+        """
+        Add data to the current block, which is compressed once it holds CHUNK_SIZE bytes.
+        :param data: bytes
+        :return: int, number of bytes written
+        """
+        self._buffer.append(data)
+        self._size += len(data)
+        if self._size >= CHUNK_SIZE:
+            self._submit()
+        return len(data)
+
+    def close(self):
+        """
+        Compress the last block, write the blocks that are still pending and close the file.
+        :return: None
+        """
+        # Empty output is still one gzip member. No member was submitted if none is pending and the file is empty
+        if self._size or not (self._pending or self.fileobj.tell()):
+            self._submit()
+        while self._pending:
+            self.fileobj.write(self._pending.popleft().result())
+        self._pool.shutdown()
+        self.fileobj.close()
+
+
+def open_gzip(filename, compress_level=9, threads=1, background=False):
+    """
+    Open a gzip output file. With more than one thread, the blocks of the file are compressed in parallel by a
+    GzipBlockWriter.
+    :param filename: str, name of the output file
+    :param compress_level: int, gzip compression level ("-cl")
+    :param threads: int, number of compression threads ("-t")
+    :param background: Bool, use a GzipBlockWriter even with one thread, so that compression runs alongside the
+    caller
+    :return: binary file object
+    """
+    if threads > 1 or background:
+        return GzipBlockWriter(filename, compress_level, threads)
+    return gzip.open(filename, "wb", compress_level)
+
+
+def open_bigwig(filename):
+    """
+    Open a bigwig output file with pyBigWig. pyBigWig is not needed to calculate GC content or to write the other
+    formats.
+    :param filename: str, name of the output file
+    :return: pyBigWig file object
+    """
+    if pyBigWig is None:
+        raise ImportError("pyBigWig is needed to write bigwig output")
+    return pyBigWig.open(filename, "w+")
+
+
+class NpyWriter:
+    """
+    Write the values of the windows of one or more records as a single one-dimensional .npy array, which can be read
+    with numpy.load(filename, mmap_mode="r") without parsing or copying, and a JSON manifest of the records next to
+    it (FILENAME.json for FILENAME.npy). The number of windows is not known until the file is closed, so the header
+    has a fixed size of NPY_HEADER bytes and is rewritten by close().
+
+    The windows of a record are evenly spaced, so only their values are stored. The manifest gives for each record
+    its name, description, length and end (the end of the last window, e.g. the end of a region), the position of its
+    first value in the array (offset), its number of windows (count) and the start of its first window (start); window
+    i starts at start + i * shift and ends at min(start + i * shift + window_size, end).
+    """
+
+    def __init__(self, filename, dtype, metadata):
+        self.filename = filename
+        self.dtype = np.dtype(dtype)
+        self.metadata = metadata
+        self.records = []
+        self.count = 0
+        self.fileobj = open(filename, "wb")  # pylint: disable=consider-using-with
+        self._write_header()
+
+    def _write_header(self):
+        header = f"{{'descr': '{self.dtype.str}', 'fortran_order': False, 'shape': ({self.count},), }}"
+        self.fileobj.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", NPY_HEADER - 10) +
+                           header.ljust(NPY_HEADER - 11).encode("latin1") + b"\n")
+
+    def add_record(self, record_id, description, seq_len):
+        """
+        Start a record, whose windows are added by add_values().
+        :param record_id: str, sequence identifier
+        :param description: str, full FASTA header of the sequence
+        :param seq_len: int, length of the sequence
+        :return: None
+        """
+        self.records.append({"name": record_id, "description": description, "length": seq_len, "end": seq_len,
+                             "offset": self.count, "count": 0, "start": None})
+
+    def add_values(self, starts, values, end):
+        """
+        Add windows to the current record.
+        :param starts: numpy.ndarray of int64, 0-based window starts
+        :param values: numpy.ndarray, values of the windows
+        :param end: int, end of the calculated part of the sequence
+        :return: None
+        """
+        record = self.records[-1]
+        if record["start"] is None and len(starts):
+            record["start"] = int(starts[0])
+        record["count"] += len(values)
+        record["end"] = end
+        self.count += len(values)
+        self.fileobj.write(values.astype(self.dtype, copy=False).tobytes())
+
+    def close(self):
+        """
+        Rewrite the header with the number of windows, close the file and write the manifest.
+        :return: None
+        """
+        self.fileobj.seek(0)
+        self._write_header()
+        self.fileobj.close()
+        manifest = dict(self.metadata, dtype=self.dtype.name, count=self.count, records=self.records)
+        with open(self.filename[:-len(EXTENSIONS["npy"])] + ".json", "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=1)
+            handle.write("\n")
+
+
+class Track:
+    """
+    Output of one metric (see METRICS) for one window size and shift pair: its settings (options, a TrackOptions), its
+    open output file (result) and its write_content function. written counts the bytes written to the output since it
+    was last reset (used by RunStats). Text is counted as it is written; gzip, npy and bigwig output is counted at the
+    writer by count_output() and close_results_file(), position being the part of the output file (path) counted so
+    far. With merge set (bigwig), or with bedGraph output, consecutive windows with the same value are written as one
+    interval, and the last interval of a record is only written by flush.
+    """
+
+    def __init__(self, options):
+        merge = (options.merge and options.output_format == "bigwig") or options.output_format == "bedgraph"
+        self.options = options._replace(merge=merge)
+        self.result = None
+        self.write_content = None
+        self.flush = None
+        self.written = 0
+        self.path = None
+        self.position = 0
+
+
+def open_output(track, filename):
+    """
+    Open OUTPUT_FILENAME plus the file extension of the track's output format.
+    :param track: Track
+    :param filename: str, output filename without extension
+    :return: file object
+    """
+    options = track.options
+    filename += EXTENSIONS[options.output_format]
+    track.path = filename
+    if options.output_format in ("wiggle", "bedgraph"):
+        return open(filename, "w+", encoding="utf-8")
+    if options.output_format == "gzip":
+        return open_gzip(filename, options.compress_level, options.threads, options.pipeline)
+    if options.output_format == "npy":
+        # Whole percentages fit in a byte
+        dtype = np.float32 if options.fraction or options.metric in VALUE_FORMATS else np.uint8
+        return NpyWriter(filename, dtype, {"metric": options.metric, "window_size": options.window_size,
+                                           "shift": options.shift})
+    return open_bigwig(filename)
+
+
+def open_results_file(track):
+    """
+    A helper function to create the output file based on chosen output format and specified output filename.
+
+    If output filename is given and output format is "wiggle", a text file called "OUTPUT_FILENAME.wig" will be opened
+    with python's textIO wrapper, where OUTPUT_FILENAME is the string given after "-o" option in the commandline.
+
+    If output filename is given and output format is "gzip", a compressed file called "OUTPUT_FILENAME.gz" will be
+    opened with open_gzip(), where OUTPUT_FILENAME is the string given after "-o" option in the commandline.
+
+    If output filename is given and output format is "bigwig", a binary file called "OUTPUT_FILENAME.bw" will be
+    opened with pyBigWig, where OUTPUT_FILENAME is the string given after "-o" option in the commandline.
+
+    If output filename is not specified, the result will be written to stdout following wiggle format.
+
+    :param track: Track
+    :return: file object
+    """
+    if track.options.output_file:
+        return open_output(track, track.options.output_file)
+    return sys.stdout
+
+
+def open_results_files(track, seq_num):
+    """
+    A helper function to create the output file based on chosen output format and specified output filename. Used when
+    multiple sequences present in one input file. "_seqNUM" will be added to the end of the output filename before the
+    file extension.
+
+    If output filename is given and output format is "wiggle", a text file called "OUTPUT_FILENAME_seqNUM.wig" will be
+    opened with python's textIO wrapper, where OUTPUT_FILENAME is the string given after "-o" option in the commandline
+    and NUM is the ordinal number of the sequence.
+
+    If output filename is given and output format is "gzip", a compressed file called "OUTPUT_FILENAME_seqNUM.gz" will
+    be opened with open_gzip(), where OUTPUT_FILENAME is the string given after "-o" option in the commandline
+    and NUM is the ordinal number of the sequence.
+
+    If output filename is given and output format is "bigwig", a binary file called "OUTPUT_FILENAME_seqNUM.bw" will be
+    opened with pyBigWig, where OUTPUT_FILENAME is the string given after "-o" option in the commandline
+    and NUM is the ordinal number of the sequence.
+
+    If output filename is not specified, the result will be written to stdout following wiggle format.
+
+    :param track: Track
+    :param seq_num: int, ordinal number of the sequence
+    :return: file object
+    """
+    if track.options.output_file:
+        return open_output(track, f"{track.options.output_file}_seq{seq_num}")
+    return sys.stdout
+
+
+def rename_results_file(track):
+    """
+    Rename the output file of the first sequence from "OUTPUT_FILENAME" to "OUTPUT_FILENAME_seq1" (keeping the file
+    extension). Used when the number of sequences is not known in advance and a second sequence is found.
+    :param track: Track
+    :return: None
+    """
+    output_file, output_format = track.options.output_file, track.options.output_format
+    if output_file:
+        extension = EXTENSIONS[output_format]
+        os.replace(output_file + extension, output_file + "_seq1" + extension)
+        if output_format == "npy":
+            os.replace(output_file + ".json", output_file + "_seq1.json")
+
+
+def count_output(track):
+    """
+    Add the bytes that the writer of a gzip or npy track has passed on to its file since they were last counted to
+    track.written. gzip output is counted once it is compressed, and bigwig output only when its file is closed.
+    :param track: Track
+    :return: None
+    """
+    if track.options.output_format in ("gzip", "npy") and track.result is not None:
+        position = track.result.fileobj.tell()
+        track.written += position - track.position
+        track.position = position
+
+
+def close_results_file(track):
+    """
+    Close the output file of a track (or flush stdout) and count the bytes that its writer only writes when it is
+    closed: the end of gzip output and the whole of bigwig output.
+    :param track: Track
+    :return: None
+    """
+    if track.result is sys.stdout:
+        sys.stdout.flush()
+        return
+    count_output(track)
+    track.result.close()
+    if track.options.output_format in ("gzip", "bigwig", "npy"):
+        track.written += os.path.getsize(track.path) - track.position
+    track.position = 0
+
+
+def write_title(track, record_id, description, seq_len, start=0):
+    """Write information to the track definition line of the wiggle file.
+    :param track: Track
+    :param record_id: str, sequence identifier used as the chromosome name
+    :param description: str, full FASTA header of the sequence
+    :param seq_len: int, length of the sequence (only needed by bigwig and npy)
+    :param start: int, 0-based position of the first window (only needed by fixedStep)
+    :return: None
+    """
+
+    options = track.options
+    trackline = f"track type=wiggle_0 name=\"{TRACK_NAMES[options.metric]}\" description=\"{description}\"\n"
+    if options.output_format == "bedgraph":
+        # The intervals carry the sequence name
+        trackline = trackline.replace("type=wiggle_0", "type=bedGraph", 1)
+        track.result.write(trackline)
+        track.written += len(trackline.encode())
+        return
+    if options.fixed_step:
+        variablestep = (f"fixedStep chrom={record_id} start={start + 1} step={options.shift} "
+                        f"span={options.window_size}\n")
+    else:
+        variablestep = f"variableStep chrom={record_id} span={options.window_size}\n"
+    if options.output_format == "wiggle":
+        track.result.write(trackline)
+        track.result.write(variablestep)
+        track.written += len(trackline.encode()) + len(variablestep)
+    elif options.output_format == "gzip":
+        track.result.write(bytes(trackline, "utf-8"))
+        track.result.write(bytes(variablestep, "utf-8"))
+    elif options.output_format == "bigwig":
+        track.result.addHeader([(record_id, seq_len)])
+    elif options.output_format == "npy":
+        track.result.add_record(record_id, description, seq_len)
+
+
+def format_variable_step(starts, percents, value_format="%d"):
+    """
+    Render a block of windows as variableStep lines ("position\tpercentage").
+    :param starts: numpy.ndarray, 0-based window starts
+    :param percents: numpy.ndarray, GC percentages
+    :param value_format: str, %-format of the values (see VALUE_FORMATS)
+    :return: str
+    """
+    line = "%d\t" + value_format + "\n"
+    return (line * len(starts)) % tuple(np.column_stack((starts + 1, percents)).ravel().tolist())
+
+
+def format_bedgraph(chrom, starts, ends, values, value_format="%d"):
+    """
+    Render intervals as bedGraph lines ("chrom\tstart\tend\tvalue", 0-based and half-open).
+    :param chrom: str, sequence identifier
+    :param starts: numpy.ndarray, 0-based interval starts
+    :param ends: numpy.ndarray, exclusive interval ends
+    :param values: numpy.ndarray, values of the intervals
+    :param value_format: str, %-format of the values (see VALUE_FORMATS)
+    :return: str
+    """
+    line = chrom.replace("%", "%%") + "\t%d\t%d\t" + value_format + "\n"
+    return (line * len(starts)) % tuple(np.column_stack((starts, ends, values)).ravel().tolist())
+
+
+def merge_runs(starts, ends, values):
+    """
+    Merge adjacent intervals with the same value, i.e. runs of windows that touch each other and have the same value.
+    :param starts: numpy.ndarray, 0-based interval starts
+    :param ends: numpy.ndarray, exclusive interval ends
+    :param values: numpy.ndarray, values of the intervals
+    :return: numpy.ndarray (starts), numpy.ndarray (ends), numpy.ndarray (values) of the merged intervals
+    """
+    breaks = np.flatnonzero((values[1:] != values[:-1]) | (starts[1:] != ends[:-1])) + 1
+    firsts = np.concatenate(([0], breaks))
+    lasts = np.concatenate((breaks, [len(starts)])) - 1
+    return starts[firsts], ends[lasts], values[firsts]
+
+
+def format_fixed_step(percents, value_format=None):
+    """
+    Render a block of GC percentages as fixedStep data lines using the precomputed PERCENT_LINES.
+    :param percents: numpy.ndarray, GC percentages
+    :param value_format: str, %-format of values that are not percentages (see VALUE_FORMATS)
+    :return: str
+    """
+    if value_format is not None:
+        return ((value_format + "\n") * len(percents)) % tuple(percents.tolist())
+    return "".join(map(PERCENT_LINES.__getitem__, percents.tolist()))
+
+
+def generate_write_content(track):
+    """
+    Generate a write_content function to handle writing results to the output file of a track. The function takes the
+    sequence identifier and length and a block of windows as arrays of 0-based starts and GC percentages. Wiggle and
+    gzip output is rendered and written WRITE_BLOCK windows at a time.
+
+    With fixed_step, wiggle and gzip output only contain the GC percentages after the fixedStep line written by
+    write_title(). The trailing window is shorter than window_size, so it is written after its own fixedStep line
+    with the span set to its length.
+
+    With merge (bedGraph output, or bigwig output with "--merge"), windows that touch the next window and have the
+    same value are written as one interval, so each interval decodes to exactly the values of its windows. The last
+    interval of a block may go on in the next block and is held back until then; track.flush is set to a function
+    that writes it, to be called at the end of each record. The trailing window ends at the end of the sequence.
+    :param track: Track
+    :return: function
+    """
+    options = track.options
+    window_size, shift, output_format = options.window_size, options.shift, options.output_format
+    value_format = VALUE_FORMATS.get(options.metric)
+    if output_format in ("wiggle", "bedgraph"):
+        def write_text(text):
+            track.result.write(text)
+            track.written += len(bytes(text, "utf-8"))
+    elif output_format == "gzip":
+        def write_text(text):
+            track.result.write(bytes(text, "utf-8"))
+    else:
+        # bigwig and npy output is written by its writer
+        write_text = None
+
+    if options.merge:
+        if output_format == "bedgraph":
+            value_format = value_format or "%d"
+
+            def write_runs(chrom, starts, ends, values):
+                for block in range(0, len(starts), WRITE_BLOCK):
+                    write_text(format_bedgraph(chrom, starts[block:block + WRITE_BLOCK],
+                                               ends[block:block + WRITE_BLOCK], values[block:block + WRITE_BLOCK],
+                                               value_format))
+        else:
+            def write_runs(chrom, starts, ends, values):
+                for block in range(0, len(starts), WRITE_BLOCK):
+                    block_starts = starts[block:block + WRITE_BLOCK].tolist()
+                    track.result.addEntries([chrom] * len(block_starts), block_starts,
+                                            ends=ends[block:block + WRITE_BLOCK].tolist(),
+                                            values=values[block:block + WRITE_BLOCK].astype(np.float64).tolist())
+        pending = []  # The last interval written to content(), as chrom and one-element starts, ends and values
+
+        def content(chrom, seq_len, starts, percents):
+            if not starts.size:
+                return
+            ends = starts + window_size
+            if seq_len is not None:
+                np.minimum(ends, seq_len, out=ends)
+            starts, ends, values = merge_runs(starts, ends, percents)
+            if pending:
+                last_chrom, last_start, last_end, last_value = pending.pop()
+                if last_chrom == chrom and last_end[0] == starts[0] and last_value[0] == values[0]:
+                    starts[0] = last_start[0]
+                else:
+                    write_runs(last_chrom, last_start, last_end, last_value)
+            pending.append((chrom, starts[-1:], ends[-1:], values[-1:]))
+            write_runs(chrom, starts[:-1], ends[:-1], values[:-1])
+
+        def flush():
+            if pending:
+                write_runs(*pending.pop())
+        track.flush = flush
+    elif options.fixed_step and output_format in ("wiggle", "gzip"):
+        def content(chrom, seq_len, starts, percents):
+            for block in range(0, len(starts), WRITE_BLOCK):
+                block_starts = starts[block:block + WRITE_BLOCK]
+                block_percents = percents[block:block + WRITE_BLOCK]
+                if block_starts[-1] + window_size > seq_len:
+                    # Only the last window of a sequence can be the trailing window
+                    write_text(format_fixed_step(block_percents[:-1], value_format) +
+                               f"fixedStep chrom={chrom} start={block_starts[-1] + 1} step={shift} "
+                               f"span={seq_len - block_starts[-1]}\n" +
+                               format_fixed_step(block_percents[-1:], value_format))
+                else:
+                    write_text(format_fixed_step(block_percents, value_format))
+    elif output_format in ("wiggle", "gzip"):
+        value_format = value_format or "%d"
+
+        def content(_chrom, _seq_len, starts, percents):
+            for block in range(0, len(starts), WRITE_BLOCK):
+                write_text(format_variable_step(starts[block:block + WRITE_BLOCK], percents[block:block + WRITE_BLOCK],
+                                                value_format))
+    elif output_format == "npy":
+        def content(_chrom, seq_len, starts, percents):
+            # The values are written as they are, without formatting
+            track.result.add_values(starts, percents, seq_len)
+    elif output_format == "bigwig" and options.fixed_step:
+        def content(chrom, _seq_len, starts, percents):
+            # The windows of a block are evenly spaced, so each block is a single fixed-step run
+            for block in range(0, len(starts), WRITE_BLOCK):
+                track.result.addEntries(chrom, int(starts[block]),
+                                        values=percents[block:block + WRITE_BLOCK].astype(np.float64).tolist(),
+                                        span=window_size, step=shift)
+    else:
+        def content(chrom, _seq_len, starts, percents):
+            # One addEntries call per WRITE_BLOCK windows; the entries are appended to the same variableStep items
+            # as with one call per window, so the file is unchanged.
+            for block in range(0, len(starts), WRITE_BLOCK):
+                track.result.addEntries(chrom, starts[block:block + WRITE_BLOCK].tolist(),
+                                        values=percents[block:block + WRITE_BLOCK].astype(np.float64).tolist(),
+                                        span=window_size)
+    return content
@@ -12,11 +12,14 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/tonyyzy/GC_analysis",
-    packages=setuptools.find_packages("GC_analysis", exclude=["tests"]),
-    scripts=['GC_analysis/GC_analysis.py'],
+    packages=setuptools.find_packages(exclude=["tests", "tests.*"]),
+    python_requires=">=3.8",
+    entry_points={
+          'console_scripts': ['GC_analysis = GC_analysis.GC_analysis:main']
+      },
     install_requires=[
-          'Biopython',
-          'pyBigWig'
+          'pyBigWig',
+          'numpy'
       ],
     classifiers=(
         "Programming Language :: Python :: 3",
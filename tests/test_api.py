@@ -0,0 +1,52 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+fasta_gc() on ex1.fasta, called in the same process, must give the windows of ex1_5_5.wig.
+Test_2
+compute_gc() on the sequence of ex1.fasta must give the same windows.
+"""
+
+import numpy as np
+
+from GC_analysis import compute_gc, fasta_gc
+
+
+def expected_windows():
+    with open("./tests/ex1_5_5.wig") as wig:
+        lines = wig.readlines()[2:]
+    return [int(line.split("\t")[0]) - 1 for line in lines], [int(line.split("\t")[1]) for line in lines]
+
+
+def test_1():
+    """Test_1"""
+    records = [(record_id, list(blocks)) for record_id, _, blocks in fasta_gc("./tests/ex1.fasta", 5, 5)]
+    assert [record_id for record_id, _ in records] == ["ENA|A00145|A00145.1"]
+    starts = np.concatenate([block_starts for block_starts, _ in records[0][1]])
+    percents = np.concatenate([block_percents for _, block_percents in records[0][1]])
+    assert (starts.tolist(), percents.tolist()) == expected_windows()
+
+
+def test_2():
+    """Test_2"""
+    with open("./tests/ex1.fasta") as fasta:
+        seq = "".join(line.strip() for line in fasta if not line.startswith(">"))
+    starts, percents = compute_gc(seq, 5, 5)
+    assert (starts.tolist(), percents.tolist()) == expected_windows()
+
+
+if __name__ == "__main__":
+    test_1()
+    test_2()
@@ -0,0 +1,78 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+Batch run over ex1.fasta, ex2.fasta and ex3.fasta with two worker processes. ex1 and ex2 must be written to the output
+directory as in single runs, while the empty ex3.fasta is reported without stopping the others.
+Test_2
+A glob pattern that matches only ex1.fasta is still a batch run: ex1 is written to the output directory.
+Test_3
+A gzip file cut off in the middle fails after some of its sequences have been written. None of its output may be left
+in the output directory, while ex1 is written as usual.
+"""
+
+import gzip
+import os
+import subprocess
+import filecmp
+
+
+def test_1():
+    """Test_1"""
+    result = subprocess.run(["python3", "-m", "GC_analysis",
+                             "-i", "./tests/ex[123].fasta",
+                             "-o", "./tests/batch_test",
+                             "-w", "5",
+                             "-s", "5",
+                             "-j", "2"], stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    assert result.returncode == 1
+    assert result.stderr == b"ERROR! ./tests/ex3.fasta contains no sequence data.\n"
+    assert filecmp.cmp("./tests/batch_test/ex1.wig", "./tests/ex1_5_5.wig")
+    assert filecmp.cmp("./tests/batch_test/ex2.wig", "./tests/ex2_5_5.wig")
+
+
+def test_2():
+    """Test_2"""
+    result = subprocess.run(["python3", "-m", "GC_analysis",
+                             "-i", "./tests/ex1.fast[a]",
+                             "-o", "./tests/batch_one_test",
+                             "-w", "5",
+                             "-s", "5"], stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    assert result.returncode == 0
+    assert filecmp.cmp("./tests/batch_one_test/ex1.wig", "./tests/ex1_5_5.wig")
+
+
+def test_3():
+    """Test_3"""
+    with open("./tests/ex4.fasta", "rb") as fasta:
+        compressed = gzip.compress(fasta.read() * 5000)
+    with open("./tests/batch_cut_test.fasta.gz", "wb") as cut:
+        cut.write(compressed[:len(compressed) // 2])
+    result = subprocess.run(["python3", "-m", "GC_analysis",
+                             "-i", "./tests/batch_cut_test.fasta.gz", "./tests/ex1.fasta",
+                             "-o", "./tests/batch_cut_test",
+                             "-w", "5",
+                             "-s", "5",
+                             "-st"], stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    assert result.returncode == 1
+    assert result.stderr.startswith(b"ERROR! ./tests/batch_cut_test.fasta.gz: ")
+    assert os.listdir("./tests/batch_cut_test") == ["ex1.wig"]
+    assert filecmp.cmp("./tests/batch_cut_test/ex1.wig", "./tests/ex1_5_5.wig")
+
+
+if __name__ == "__main__":
+    test_1()
+    test_2()
+    test_3()
@@ -22,7 +22,7 @@ import subprocess
 
 def test_error_ex3():
     """test_error_ex3"""
-    result = subprocess.run(["python3", "./GC_analysis/GC_analysis.py",
+    result = subprocess.run(["python3", "-m", "GC_analysis",
                              "-i", "./tests/ex3.fasta",
                              "-o", "./tests/ex3.fasta.wig",
                              "-w", "5",
@@ -0,0 +1,38 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+
+"""
+Test_1
+A single sequence split with a chunk size below the window size. The chunks are widened to at least one window, so the
+output of two worker processes is the same as the serial output.
+"""
+
+import filecmp
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    for name, extra in (("serial", []), ("split", ["-j", "2", "-ss", "20"])):
+        subprocess.run(["python3", "-m", "GC_analysis",
+                        "-i", "./tests/ex1.fasta",
+                        "-o", "./tests/ex1_50_10_" + name + "_test",
+                        "-w", "50",
+                        "-s", "10"] + extra)
+    assert filecmp.cmp("./tests/ex1_50_10_split_test.wig", "./tests/ex1_50_10_serial_test.wig", shallow=False)
+
+
+if __name__ == "__main__":
+    test_1()
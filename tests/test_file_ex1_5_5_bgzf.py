@@ -0,0 +1,36 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+BGZF compressed ex1.fasta, decompressed by two threads. The result must be the same as for the plain file.
+"""
+
+import subprocess
+import filecmp
+
+
+def test_1():
+    """Test_1"""
+    subprocess.run(["python3", "-m", "GC_analysis",
+                    "-i", "./tests/ex1.fasta.gz",
+                    "-o", "./tests/ex1_5_5_bgzf_test",
+                    "-w", "5",
+                    "-s", "5",
+                    "-t", "2"])
+    assert filecmp.cmp("./tests/ex1_5_5_bgzf_test.wig", "./tests/ex1_5_5.wig")
+
+
+if __name__ == "__main__":
+    test_1()
@@ -0,0 +1,63 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+Two runs on ex1.fasta with a result cache. The first run stores the result and the second copies it from the cache;
+both must be the same as ex1_5_5.wig.
+Test_2
+Runs on ex1.fasta with a result cache and -st, -j 2 or standard input, which do not use the cache. Each run must warn
+on stderr that the cache is bypassed and still give ex1_5_5.wig, and no cache directory is created.
+"""
+
+import filecmp
+import os
+import shutil
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    shutil.rmtree("./tests/cache_test", ignore_errors=True)
+    for run in ("1", "2"):
+        subprocess.run(["python3", "-m", "GC_analysis",
+                        "-i", "./tests/ex1.fasta",
+                        "-o", "./tests/ex1_5_5_cache_test" + run,
+                        "-w", "5",
+                        "-s", "5",
+                        "-cd", "./tests/cache_test"])
+        assert filecmp.cmp("./tests/ex1_5_5_cache_test{}.wig".format(run), "./tests/ex1_5_5.wig")
+    assert len(os.listdir("./tests/cache_test")) == 1
+
+
+def test_2():
+    """Test_2"""
+    shutil.rmtree("./tests/cache_bypass_test", ignore_errors=True)
+    with open("./tests/ex1_5_5.wig", "rb") as whole:
+        expected = whole.read()
+    for options in (["-i", "./tests/ex1.fasta", "-st"], ["-i", "./tests/ex1.fasta", "-j", "2"], ["-i", "-"]):
+        with open("./tests/ex1.fasta", "rb") as fasta:
+            result = subprocess.run(["python3", "-m", "GC_analysis",
+                                     "-w", "5",
+                                     "-s", "5",
+                                     "-cd", "./tests/cache_bypass_test"] + options,
+                                    stdin=fasta, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        assert result.stdout == expected
+        assert b"WARNING! The result cache (-cd) is not used" in result.stderr
+    assert not os.path.exists("./tests/cache_bypass_test")
+
+
+if __name__ == "__main__":
+    test_1()
+    test_2()
@@ -0,0 +1,44 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+GC index of a copy of ex1.fasta. The run after "GC_analysis index" is calculated from the .gci file and must give the
+same result as ex1_5_5.wig.
+"""
+
+import filecmp
+import os
+import shutil
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    shutil.copy("./tests/ex1.fasta", "./tests/ex1_index_test.fasta")
+    subprocess.run(["python3", "-m", "GC_analysis", "index",
+                    "-i", "./tests/ex1_index_test.fasta"])
+    assert os.path.isfile("./tests/ex1_index_test.fasta.gci")
+    subprocess.run(["python3", "-m", "GC_analysis",
+                    "-i", "./tests/ex1_index_test.fasta",
+                    "-o", "./tests/ex1_5_5_index_test",
+                    "-w", "5",
+                    "-s", "5"])
+    os.remove("./tests/ex1_index_test.fasta")
+    os.remove("./tests/ex1_index_test.fasta.gci")
+    assert filecmp.cmp("./tests/ex1_5_5_index_test.wig", "./tests/ex1_5_5.wig")
+
+
+if __name__ == "__main__":
+    test_1()
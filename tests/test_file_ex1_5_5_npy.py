@@ -0,0 +1,48 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+
+"""
+Test_1
+ex1.fasta written as a NumPy array with a JSON manifest. The windows decoded from the manifest and the array must be
+the same as the windows of ex1_5_5.wig, and the array must be readable with mmap_mode="r".
+"""
+
+import json
+import subprocess
+import numpy as np
+
+
+def test_1():
+    """Test_1"""
+    subprocess.run(["python3", "-m", "GC_analysis",
+                    "-i", "./tests/ex1.fasta",
+                    "-o", "./tests/ex1_5_5_test",
+                    "-w", "5",
+                    "-s", "5",
+                    "-f", "npy"])
+    with open("./tests/ex1_5_5.wig") as expected:
+        windows = [tuple(map(int, line.split())) for line in expected if line[0].isdigit()]
+    values = np.load("./tests/ex1_5_5_test.npy", mmap_mode="r")
+    with open("./tests/ex1_5_5_test.json") as manifest:
+        manifest = json.load(manifest)
+    assert values.dtype == np.uint8 and manifest["count"] == len(values)
+    record = manifest["records"][0]
+    starts = record["start"] + np.arange(record["count"]) * manifest["shift"] + 1
+    values = values[record["offset"]:record["offset"] + record["count"]]
+    assert list(zip(starts.tolist(), values.tolist())) == windows
+
+
+if __name__ == "__main__":
+    test_1()
@@ -0,0 +1,47 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+ex1.fasta written to stdout with progress reports on stderr and in a heartbeat file. stdout must be the same as
+ex1_5_5.wig, and the heartbeat file must show the finished run.
+"""
+
+import json
+import os
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    process = subprocess.run(["python3", "-m", "GC_analysis",
+                              "-i", "./tests/ex1.fasta",
+                              "-w", "5",
+                              "-s", "5",
+                              "-p",
+                              "-pi", "0",
+                              "-hb", "./tests/ex1_5_5_progress_test.json"], stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE)
+    with open("./tests/ex1_5_5.wig", "rb") as expected:
+        assert process.stdout == expected.read()
+    assert process.stderr.startswith(b"PROGRESS ./tests/ex1.fasta: record 1/")
+    assert b" ENA|A00145|A00145.1: 678/678 bp (100.0%)" in process.stderr
+    with open("./tests/ex1_5_5_progress_test.json") as heartbeat:
+        state = json.load(heartbeat)
+    os.remove("./tests/ex1_5_5_progress_test.json")
+    assert (state["state"], state["bases_done"], state["windows"]) == ("done", 678, 136)
+
+
+if __name__ == "__main__":
+    test_1()
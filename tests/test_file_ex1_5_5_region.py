@@ -0,0 +1,64 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+Region query on ex1.fasta. The region starts at a window boundary of the whole-sequence run, so the result must be the
+matching lines of ex1_5_5.wig, with the same genome-absolute positions.
+Test_2
+The index built for the region query is only saved next to the input file with -wf.
+"""
+
+import os
+import shutil
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    subprocess.run(["python3", "-m", "GC_analysis",
+                    "-i", "./tests/ex1.fasta",
+                    "-o", "./tests/ex1_5_5_region_test",
+                    "-w", "5",
+                    "-s", "5",
+                    "-r", "ENA|A00145|A00145.1:101-200"])
+    with open("./tests/ex1_5_5.wig") as whole:
+        lines = whole.readlines()
+    expected = lines[:2] + [line for line in lines[2:] if 101 <= int(line.split("\t")[0]) <= 196]
+    with open("./tests/ex1_5_5_region_test.wig") as result:
+        assert result.readlines() == expected
+
+
+def test_2():
+    """Test_2"""
+    shutil.copy("./tests/ex1.fasta", "./tests/ex1_fai_test.fasta")
+    command = ["python3", "-m", "GC_analysis",
+               "-i", "./tests/ex1_fai_test.fasta",
+               "-o", "./tests/ex1_fai_test",
+               "-w", "5",
+               "-s", "5",
+               "-r", "ENA|A00145|A00145.1:101-200"]
+    assert subprocess.run(command).returncode == 0
+    assert not os.path.exists("./tests/ex1_fai_test.fasta.fai")
+    assert subprocess.run(command + ["-wf"]).returncode == 0
+    with open("./tests/ex1_fai_test.fasta.fai") as fai:
+        fields = fai.read().split("\t")[:2]
+    os.remove("./tests/ex1_fai_test.fasta")
+    os.remove("./tests/ex1_fai_test.fasta.fai")
+    assert fields == ["ENA|A00145|A00145.1", "678"]
+
+
+if __name__ == "__main__":
+    test_1()
+    test_2()
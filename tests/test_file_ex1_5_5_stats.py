@@ -0,0 +1,89 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+ex1.fasta with --stats and --stats_file. The output must be the same as ex1_5_5.wig, and the statistics must count
+the bases, windows and bytes of ex1.fasta.
+Test_2
+bigwig output with --stats_file. bigwig output is only written when the file is closed, and the bytes written must be
+the size of the bigwig file.
+Test_3
+--stats without the resource module, which only exists on Unix. The run must succeed and report the peak memory use
+as unknown.
+"""
+
+import filecmp
+import json
+import os
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    process = subprocess.run(["python3", "-m", "GC_analysis",
+                              "-i", "./tests/ex1.fasta",
+                              "-o", "./tests/ex1_5_5_stats_test",
+                              "-w", "5",
+                              "-s", "5",
+                              "-sts",
+                              "-sf", "./tests/ex1_5_5_stats_test.json"], stderr=subprocess.PIPE)
+    assert filecmp.cmp("./tests/ex1_5_5_stats_test.wig", "./tests/ex1_5_5.wig")
+    assert process.stderr.startswith(b"STATS ./tests/ex1.fasta: 1 records, 678 bp, 136 windows")
+    with open("./tests/ex1_5_5_stats_test.json") as stats:
+        report = json.load(stats)
+    os.remove("./tests/ex1_5_5_stats_test.json")
+    assert (report["bases"], report["windows"]) == (678, 136)
+    assert report["bytes_written"] == os.path.getsize("./tests/ex1_5_5.wig")
+    assert [record["record"] for record in report["records"]] == ["ENA|A00145|A00145.1"]
+
+
+def test_2():
+    """Test_2"""
+    subprocess.run(["python3", "-m", "GC_analysis",
+                    "-i", "./tests/ex1.fasta",
+                    "-o", "./tests/ex1_5_5_stats_test",
+                    "-w", "5",
+                    "-s", "5",
+                    "-f", "bigwig",
+                    "-sf", "./tests/ex1_5_5_stats_test.json"])
+    with open("./tests/ex1_5_5_stats_test.json") as stats:
+        report = json.load(stats)
+    os.remove("./tests/ex1_5_5_stats_test.json")
+    assert report["bytes_written"] == os.path.getsize("./tests/ex1_5_5_stats_test.bw") > 0
+
+
+
+def test_3():
+    """Test_3"""
+    process = subprocess.run(["python3", "-c",
+                              "import runpy, sys\n"
+                              "sys.modules['resource'] = None\n"
+                              "sys.argv = ['GC_analysis', '-i', './tests/ex1.fasta',"
+                              " '-o', './tests/ex1_5_5_stats_test', '-w', '5', '-s', '5',"
+                              " '-sts', '-sf', './tests/ex1_5_5_stats_test.json']\n"
+                              "runpy.run_module('GC_analysis', run_name='__main__')\n"],
+                             stderr=subprocess.PIPE)
+    with open("./tests/ex1_5_5_stats_test.json") as stats:
+        report = json.load(stats)
+    os.remove("./tests/ex1_5_5_stats_test.json")
+    assert process.stderr.rstrip().endswith(b"peak RSS unknown")
+    assert report["peak_rss_bytes"] is None and report["children_peak_rss_bytes"] is None
+    assert filecmp.cmp("./tests/ex1_5_5_stats_test.wig", "./tests/ex1_5_5.wig")
+
+
+if __name__ == "__main__":
+    test_1()
+    test_2()
+    test_3()
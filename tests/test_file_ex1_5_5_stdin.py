@@ -0,0 +1,57 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+
+"""
+Test_1
+ex1.fasta read from standard input (-i -), plain and gzip compressed, with the windows written to standard output.
+The output must be the same as ex1_5_5.wig.
+Test_2
+fixedStep output of standard input with --stream. The lengths cannot be read first, so whole sequences are loaded and
+the output must be the same as ex1_5_5_fs.wig.
+"""
+
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    with open("./tests/ex1_5_5.wig") as expected:
+        expected = expected.read()
+    for input_file in ("./tests/ex1.fasta", "./tests/ex1.fasta.gz"):
+        with open(input_file, "rb") as stdin:
+            result = subprocess.run(["python3", "-m", "GC_analysis",
+                                     "-i", "-",
+                                     "-w", "5",
+                                     "-s", "5"], stdin=stdin, stdout=subprocess.PIPE, universal_newlines=True)
+        assert result.stdout == expected
+
+
+def test_2():
+    """Test_2"""
+    with open("./tests/ex1_5_5_fs.wig") as expected:
+        expected = expected.read()
+    with open("./tests/ex1.fasta", "rb") as stdin:
+        result = subprocess.run(["python3", "-m", "GC_analysis",
+                                 "-i", "-",
+                                 "-w", "5",
+                                 "-s", "5",
+                                 "-st",
+                                 "-fs"], stdin=stdin, stdout=subprocess.PIPE, universal_newlines=True)
+    assert result.stdout == expected
+
+
+if __name__ == "__main__":
+    test_1()
+    test_2()
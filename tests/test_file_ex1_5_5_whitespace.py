@@ -0,0 +1,41 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+ex1.fasta with tabs and spaces inside and at the end of its sequence lines. The whitespace is not part of the sequence,
+so the result must be ex1_5_5.wig, whether the file is read whole, in chunks or by region.
+"""
+
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    with open("./tests/ex1.fasta") as fasta:
+        lines = fasta.read().split("\n")
+    with open("./tests/ex1_whitespace_test.fasta", "w") as spaced:
+        spaced.write("\n".join([lines[0]] + [line[:7] + "\t" + line[7:] + " \t" for line in lines[1:] if line]) + "\n")
+    with open("./tests/ex1_5_5.wig", "rb") as whole:
+        expected = whole.read()
+    for options in ([], ["-st"], ["-r", "ENA|A00145|A00145.1"]):
+        result = subprocess.run(["python3", "-m", "GC_analysis",
+                                 "-i", "./tests/ex1_whitespace_test.fasta",
+                                 "-w", "5",
+                                 "-s", "5"] + options, stdout=subprocess.PIPE)
+        assert result.stdout == expected
+
+
+if __name__ == "__main__":
+    test_1()
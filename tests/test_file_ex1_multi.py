@@ -0,0 +1,37 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+Two window size and shift pairs (5/5 and 5/3) in one run. Each pair is written to its own file, which must be the same
+as the output of a run with that pair alone.
+"""
+
+import subprocess
+import filecmp
+
+
+def test_1():
+    """Test_1"""
+    subprocess.run(["python3", "-m", "GC_analysis",
+                    "-i", "./tests/ex1.fasta",
+                    "-o", "./tests/ex1_multi_test",
+                    "-w", "5",
+                    "-s", "5", "3"])
+    assert filecmp.cmp("./tests/ex1_multi_test_w5_s5.wig", "./tests/ex1_5_5.wig")
+    assert filecmp.cmp("./tests/ex1_multi_test_w5_s3.wig", "./tests/ex1_5_3.wig")
+
+
+if __name__ == "__main__":
+    test_1()
@@ -0,0 +1,25 @@
+"""
+Test_1
+gzip output compressed in blocks by two threads at level 1. Decompressed, it must be the same as the wiggle output.
+"""
+
+import filecmp
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    subprocess.run(["python3", "-m", "GC_analysis",
+                    "-i", "./tests/ex2.fasta",
+                    "-o", "./tests/ex2_5_3_gz_threads_test",
+                    "-w", "5",
+                    "-s", "3",
+                    "-f", "gzip",
+                    "-cl", "1",
+                    "-t", "2"])
+    subprocess.run(["gzip", "-d", "-f", "./tests/ex2_5_3_gz_threads_test.wig.gz"])
+    assert filecmp.cmp("./tests/ex2_5_3_gz_threads_test.wig", "./tests/ex2_5_3.wig")
+
+
+if __name__ == "__main__":
+    test_1()
@@ -0,0 +1,41 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+
+"""
+Test_1
+ex2.fasta read, calculated and written in separate threads (-pl), with whole sequences and in streaming mode with small
+chunks. The gzip output must decompress to ex2_5_3.wig.
+"""
+
+import filecmp
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    for mode in ([], ["-st", "-cs", "50"]):
+        subprocess.run(["python3", "-m", "GC_analysis",
+                        "-i", "./tests/ex2.fasta",
+                        "-o", "./tests/ex2_5_3_pipeline_test",
+                        "-w", "5",
+                        "-s", "3",
+                        "-f", "gzip",
+                        "-pl"] + mode)
+        subprocess.run(["gzip", "-d", "-f", "./tests/ex2_5_3_pipeline_test.wig.gz"])
+        assert filecmp.cmp("./tests/ex2_5_3_pipeline_test.wig", "./tests/ex2_5_3.wig")
+
+
+if __name__ == "__main__":
+    test_1()
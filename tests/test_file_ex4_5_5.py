@@ -0,0 +1,42 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+ex4.fasta has two sequences and no .fai index, so the number of sequences is only known after the first one has been
+written. Each sequence must still end up in its own "_seqNUM" file.
+"""
+
+import filecmp
+import os
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    if os.path.exists("./tests/ex4.fasta.fai"):
+        # Written by runs that scan the file (e.g. --jobs)
+        os.remove("./tests/ex4.fasta.fai")
+    subprocess.run(["python3", "-m", "GC_analysis",
+                    "-i", "./tests/ex4.fasta",
+                    "-o", "./tests/ex4_5_5_test",
+                    "-w", "5",
+                    "-s", "5"])
+    assert filecmp.cmp("./tests/ex4_5_5_test_seq1.wig", "./tests/ex2_5_5.wig")
+    assert filecmp.cmp("./tests/ex4_5_5_test_seq2.wig", "./tests/ex1_5_5.wig")
+    assert not os.path.exists("./tests/ex4_5_5_test.wig")
+
+
+if __name__ == "__main__":
+    test_1()
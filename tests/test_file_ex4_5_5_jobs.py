@@ -0,0 +1,64 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+ex4.fasta is ex2.fasta followed by ex1.fasta. The larger second record is scheduled first by the process pool, but the
+single output file must keep the input order.
+
+Test_2
+The same with ex4.fasta compressed with plain gzip, whose records are read in one pass and sent to the workers.
+"""
+
+import gzip
+import shutil
+import subprocess
+
+
+def test_1():
+    """Test_1"""
+    subprocess.run(["python3", "-m", "GC_analysis",
+                    "-i", "./tests/ex4.fasta",
+                    "-o", "./tests/ex4_5_5_jobs_test",
+                    "-w", "5",
+                    "-s", "5",
+                    "-one",
+                    "-j", "2"])
+    with open("./tests/ex2_5_5.wig") as first, open("./tests/ex1_5_5.wig") as second:
+        expected = first.read() + second.read()
+    with open("./tests/ex4_5_5_jobs_test.wig") as result:
+        assert result.read() == expected
+
+
+
+def test_2():
+    """Test_2"""
+    with open("./tests/ex4.fasta", "rb") as plain, gzip.open("./tests/ex4_jobs_test.fasta.gz", "wb") as compressed:
+        shutil.copyfileobj(plain, compressed)
+    subprocess.run(["python3", "-m", "GC_analysis",
+                    "-i", "./tests/ex4_jobs_test.fasta.gz",
+                    "-o", "./tests/ex4_5_5_jobs_gz_test",
+                    "-w", "5",
+                    "-s", "5",
+                    "-one",
+                    "-j", "2"])
+    with open("./tests/ex2_5_5.wig") as first, open("./tests/ex1_5_5.wig") as second:
+        expected = first.read() + second.read()
+    with open("./tests/ex4_5_5_jobs_gz_test.wig") as result:
+        assert result.read() == expected
+
+
+if __name__ == "__main__":
+    test_1()
+    test_2()
@@ -0,0 +1,44 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Test_1
+All metrics of ex5.fasta, which has soft-masked bases and N, counting lower-case g and c and leaving N out of the GC
+percentage. Each metric is written to its own file and must be the same as ex5_5_5_METRIC.wig, also in streaming mode.
+"""
+
+import filecmp
+import subprocess
+
+METRICS = ["gc", "n", "softmask", "skew", "cpg"]
+
+
+def test_1():
+    """Test_1"""
+    for mode in ([], ["-st", "-cs", "100"]):
+        subprocess.run(["python3", "-m", "GC_analysis",
+                        "-i", "./tests/ex5.fasta",
+                        "-o", "./tests/ex5_5_5_test",
+                        "-w", "5",
+                        "-s", "5",
+                        "-one",
+                        "-ic",
+                        "-en",
+                        "-mt"] + METRICS + mode)
+        for metric in METRICS:
+            assert filecmp.cmp("./tests/ex5_5_5_test_{}.wig".format(metric), "./tests/ex5_5_5_{}.wig".format(metric))
+
+
+if __name__ == "__main__":
+    test_1()
@@ -0,0 +1,42 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+
+"""
+Test_1
+GC percentage, GC skew and CpG o/e of the intervals of ex5.bed, which has extra columns, an interval past the end of
+its sequence, an empty interval and a sequence that is not in ex5.fasta. The output must be the same as
+ex5_gc_skew_cpg.bed, whether it is written to a file or to stdout.
+"""
+
+import filecmp
+import subprocess
+
+ARGS = ["python3", "-m", "GC_analysis",
+        "-i", "./tests/ex5.fasta",
+        "-rg", "./tests/ex5.bed",
+        "-ic",
+        "-mt", "gc", "skew", "cpg"]
+
+
+def test_1():
+    """Test_1"""
+    subprocess.run(ARGS + ["-o", "./tests/ex5_regions_test"])
+    assert filecmp.cmp("./tests/ex5_regions_test.bed", "./tests/ex5_gc_skew_cpg.bed")
+    with open("./tests/ex5_gc_skew_cpg.bed") as expected:
+        assert subprocess.run(ARGS, stdout=subprocess.PIPE, universal_newlines=True).stdout == expected.read()
+
+
+if __name__ == "__main__":
+    test_1()
@@ -0,0 +1,359 @@
+"""
+.. See the NOTICE file distributed with this work for additional information
+   regarding copyright ownership.
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+       http://www.apache.org/licenses/LICENSE-2.0
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+"""
+Offline benchmark of GC_analysis on synthetic genomes.
+
+Deterministic FASTA files are generated once into a data directory, then every case (input file, window size and
+shift, command-line output format or compute path) is run in its own process so that its wall time and peak RSS can
+be measured with os.wait4(). The results are written as JSON, and a previous JSON file can be given to compare the two
+runs and report regressions.
+
+    python3 tests/time_profile/benchmark.py --quick --output before.json
+    python3 tests/time_profile/benchmark.py --quick --output after.json --compare before.json
+"""
+
+import argparse as ap
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The command-line program of the checkout under ROOT, run through the package's main()
+PROGRAM = [sys.executable, "-c",
+           "import sys; sys.path.insert(0, {!r}); from GC_analysis import main; main()".format(ROOT)]
+SIZES = {"k": 10 ** 3, "M": 10 ** 6, "G": 10 ** 9}
+LINE_WIDTH = 60
+CONTIG_SIZE = 10 ** 4  # Length of the records of the many-contig genomes
+
+# A compute path run in a child process: import the package, read the whole input and calculate the windows
+COMPUTE_CODE = """
+import sys
+sys.path.insert(0, {root!r})
+from GC_analysis import compute_gc, fasta_gc
+path, window_size, shift = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+if {kind!r} == "compute_gc":
+    with open(path, "rb") as fasta:
+        records = fasta.read().split(b">")[1:]
+    for record in records:
+        compute_gc(record.split(b"\\n", 1)[1].replace(b"\\n", b""), window_size, shift)
+else:
+    for _, _, blocks in fasta_gc(path, window_size, shift):
+        for _ in blocks:
+            pass
+"""
+
+
+def get_args():
+    """
+    Handle the command-line options of the benchmark.
+    :return: argparse.Namespace
+    """
+    parser = ap.ArgumentParser(description="Offline benchmark of GC_analysis on synthetic genomes.")
+    parser.add_argument("--sizes", type=str, default="1k,1M,10M,100M,250M",
+                        help="Comma-separated genome sizes, with k, M or G suffixes")
+    parser.add_argument("--layouts", type=str, default="single,contigs",
+                        help="Comma-separated genome layouts: single (one record) and contigs (records of {} bp)"
+                        .format(CONTIG_SIZE))
+    parser.add_argument("--params", type=str, default="5:5,5:3,100:100,1000:500,100000:100000",
+                        help="Comma-separated window_size:shift pairs")
+    parser.add_argument("--formats", type=str, default="wiggle,gzip,bigwig",
+                        help="Comma-separated output formats of the command-line runs")
+    parser.add_argument("--paths", type=str, default="compute_gc,fasta_gc",
+                        help="Comma-separated compute paths run without writing output")
+    parser.add_argument("--extra", type=str, default="",
+                        help="Extra options passed to every command-line run, e.g. \"-st\" or \"-j 4\"")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of every case; the fastest run is reported")
+    parser.add_argument("--quick", action="store_true", help="Only 1k and 1M genomes, for a smoke test")
+    parser.add_argument("--data_dir", type=str, default=os.path.join(tempfile.gettempdir(), "GC_analysis_benchmark"),
+                        help="Directory of the synthetic FASTA files, which are reused between runs")
+    parser.add_argument("--output", type=str, help="JSON file the results are written to")
+    parser.add_argument("--compare", type=str, help="JSON file of a previous run to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown or RSS increase reported as a regression by --compare")
+    parser.add_argument("--write_genome", nargs=3, help=ap.SUPPRESS)
+    args = parser.parse_args()
+    if args.quick:
+        args.sizes = "1k,1M"
+    return args
+
+
+def parse_size(size):
+    """
+    Convert a size such as "250M" to a number of base pairs.
+    :param size: str
+    :return: int
+    """
+    if size[-1] in SIZES:
+        return int(float(size[:-1]) * SIZES[size[-1]])
+    return int(size)
+
+
+def write_genome(path, length, layout, seed=0):
+    """
+    Write a deterministic synthetic genome: random bases with a GC content drifting between 35% and 65%, a lowercase
+    (soft-masked) stretch and a run of N every 100 kbp, in lines of LINE_WIDTH bases.
+    :param path: str, name of the FASTA file
+    :param length: int, number of base pairs
+    :param layout: str, "single" or "contigs"
+    :param seed: int, seed of the random generator
+    :return: None
+    """
+    rng = np.random.default_rng(seed)
+    record_length = length if layout == "single" else min(CONTIG_SIZE, length)
+    block_size = LINE_WIDTH << 16  # Whole lines, so that only the last block of a record has a short line
+    with open(path + ".tmp", "wb") as fasta:
+        written = record = 0
+        while written < length:
+            record += 1
+            size = min(record_length, length - written)
+            fasta.write(">synthetic_{} synthetic {} genome record {}\n".format(record, layout, record).encode())
+            for start in range(0, size, block_size):
+                positions = written + start + np.arange(min(block_size, size - start))
+                is_gc = rng.random(len(positions)) < 0.5 + 0.15 * np.sin(positions / 50000.0)
+                codes = np.where(is_gc, np.where(rng.random(len(positions)) < 0.5, ord("G"), ord("C")),
+                                 np.where(rng.random(len(positions)) < 0.5, ord("A"), ord("T")))
+                offsets = positions % 100000
+                codes = np.where((offsets >= 1000) & (offsets < 2000), codes + 32, codes)
+                codes = np.where((offsets >= 5000) & (offsets < 5100), ord("N"), codes).astype(np.uint8)
+                full = len(codes) - len(codes) % LINE_WIDTH
+                lines = codes[:full].reshape(-1, LINE_WIDTH)
+                fasta.write(np.hstack((lines, np.full((len(lines), 1), ord("\n"), np.uint8))).tobytes())
+                if full < len(codes):
+                    fasta.write(codes[full:].tobytes() + b"\n")
+            written += size
+    os.replace(path + ".tmp", path)
+
+
+def genome(data_dir, size, layout):
+    """
+    Get the synthetic genome of a size and layout, writing it the first time.
+    :param data_dir: str
+    :param size: str, size as given to --sizes
+    :param layout: str, "single" or "contigs"
+    :return: str, name of the FASTA file, and int, number of base pairs
+    """
+    length = parse_size(size)
+    path = os.path.join(data_dir, "synthetic_{}_{}.fasta".format(size, layout))
+    if not os.path.isfile(path):
+        # Written by a child process, as the peak RSS of this one would be inherited by the measured runs
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--write_genome", path, str(length), layout],
+                       check=True)
+    return path, length
+
+
+def count_windows(length, layout, window_size, shift):
+    """
+    Count the windows of a genome, trailing windows included.
+    :param length: int, number of base pairs
+    :param layout: str, "single" or "contigs"
+    :param window_size: int
+    :param shift: int
+    :return: int
+    """
+    record_length = length if layout == "single" else min(CONTIG_SIZE, length)
+    records = [record_length] * (length // record_length)
+    if length % record_length:
+        records.append(length % record_length)
+    total = 0
+    for record in records:
+        windows = max((record - window_size + shift) // shift, 0)
+        total += windows + (windows * shift < record)
+    return total
+
+
+def measure(command):
+    """
+    Run a command and measure its wall time and peak RSS.
+    :param command: list of str
+    :return: float (seconds), int (peak RSS in bytes), int (exit status)
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    error = process.stderr.read()
+    process.stderr.close()
+    if process.returncode:
+        sys.stderr.write(error.decode(errors="replace"))
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return wall, rss, process.returncode
+
+
+def run_case(case, command, repeat, output_dir=None):
+    """
+    Run a case repeat times and add the fastest wall time, the peak RSS and the throughput to it, and the size of
+    its output when it writes to output_dir.
+    :param case: dict, description of the case (genome length and windows included)
+    :param command: list of str
+    :param repeat: int
+    :param output_dir: str/None, directory that only holds the output files of the command
+    :return: dict
+    """
+    runs = [measure(command) for _ in range(repeat)]
+    wall = min(run[0] for run in runs)
+    case.update({"seconds": round(wall, 4),
+                 "peak_rss_bytes": max(run[1] for run in runs),
+                 "status": max(run[2] for run in runs),
+                 "bp_per_second": round(case["length"] / wall),
+                 "windows_per_second": round(case["windows"] / wall)})
+    written = ""
+    if output_dir is not None:
+        case["output_bytes"] = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir))
+        written = ", {} bytes written".format(case["output_bytes"])
+    sys.stderr.write("{name}: {seconds:.3f} s, {bp_per_second:.3g} bp/s, {windows_per_second:.3g} windows/s, "
+                     "{rss:.0f} MiB{written}\n".format(rss=case["peak_rss_bytes"] / 2 ** 20, written=written, **case))
+    return case
+
+
+def has_bigwig():
+    """
+    Check whether pyBigWig can be imported, which bigwig output needs.
+    :return: Bool
+    """
+    try:
+        import pyBigWig  # noqa: F401 pylint: disable=unused-import,import-outside-toplevel
+    except ImportError:
+        return False
+    return True
+
+
+def has_option(option):
+    """
+    Check whether the command-line program lists an option in its --help, so that a checkout without it (e.g. the
+    commit a run is compared with) can be benchmarked too.
+    :param option: str, short option such as "-ni"
+    :return: Bool
+    """
+    usage = subprocess.run(PROGRAM + ["--help"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                           check=False).stdout.decode()
+    return re.search(r"(?<![\w-]){}\b".format(re.escape(option)), usage) is not None
+
+
+def run_benchmark(args):
+    """
+    Run every case of the benchmark.
+    :param args: argparse.Namespace
+    :return: list of dict
+    """
+    os.makedirs(args.data_dir, exist_ok=True)
+    params = [tuple(int(value) for value in pair.split(":")) for pair in args.params.split(",")]
+    formats = [fmt for fmt in args.formats.split(",") if fmt]
+    if "bigwig" in formats and not has_bigwig():
+        sys.stderr.write("pyBigWig is not installed, bigwig cases are skipped\n")
+        formats.remove("bigwig")
+    # A GC index left next to a genome would be used instead of reading it
+    no_index = ["-ni"] if has_option("-ni") else []
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for size in args.sizes.split(","):
+            for layout in args.layouts.split(","):
+                path, length = genome(args.data_dir, size, layout)
+                for window_size, shift in params:
+                    case = {"size": size, "layout": layout, "length": length, "window_size": window_size,
+                            "shift": shift, "windows": count_windows(length, layout, window_size, shift)}
+                    for fmt in formats:
+                        if fmt == "bigwig" and window_size > shift:
+                            continue
+                        output = os.path.join(output_dir, "out")
+                        command = PROGRAM + ["-i", path, "-w", str(window_size), "-s", str(shift), "-o", output,
+                                             "-f", fmt] + no_index + args.extra.split()
+                        name = "cli {} {} {}:{} {} {}".format(size, layout, window_size, shift, fmt, args.extra)
+                        results.append(run_case(dict(case, name=name.strip(), kind="cli", format=fmt,
+                                                     extra=args.extra), command, args.repeat, output_dir))
+                        for leftover in os.listdir(output_dir):
+                            os.remove(os.path.join(output_dir, leftover))
+                    for path_name in [name for name in args.paths.split(",") if name]:
+                        command = [sys.executable, "-c", COMPUTE_CODE.format(root=ROOT, kind=path_name), path,
+                                   str(window_size), str(shift)]
+                        name = "{} {} {} {}:{}".format(path_name, size, layout, window_size, shift)
+                        results.append(run_case(dict(case, name=name, kind=path_name), command, args.repeat))
+    return results
+
+
+def environment():
+    """
+    Describe the machine and the commit the benchmark was run on.
+    :return: dict
+    """
+    try:
+        commit = subprocess.run(["git", "-C", ROOT, "rev-parse", "HEAD"], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+            "numpy": np.__version__, "platform": platform.platform(), "processor": platform.processor(),
+            "cpus": os.cpu_count()}
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare the results with those of a previous run, case by case.
+    :param results: list of dict
+    :param baseline: dict, contents of a JSON file written by a previous run
+    :param threshold: float, relative slowdown or RSS increase reported as a regression
+    :return: int, number of regressions
+    """
+    previous = {case["name"]: case for case in baseline["results"]}
+    regressions = 0
+    sys.stdout.write("{:<60} {:>10} {:>10} {:>8} {:>8}\n".format("case", "before s", "after s", "time", "rss"))
+    for case in results:
+        if case["name"] not in previous:
+            continue
+        before = previous[case["name"]]
+        time_ratio = case["seconds"] / before["seconds"] if before["seconds"] else 1.0
+        rss_ratio = case["peak_rss_bytes"] / before["peak_rss_bytes"] if before["peak_rss_bytes"] else 1.0
+        regression = time_ratio > 1 + threshold or rss_ratio > 1 + threshold
+        regressions += regression
+        sys.stdout.write("{:<60} {:>10.3f} {:>10.3f} {:>7.2f}x {:>7.2f}x{}\n".format(
+            case["name"], before["seconds"], case["seconds"], time_ratio, rss_ratio, "  REGRESSION" if regression
+            else ""))
+    return regressions
+
+
+def main():
+    """
+    Run the benchmark, write the results and compare them with a previous run.
+    :return: int, exit status
+    """
+    args = get_args()
+    if args.write_genome:
+        write_genome(args.write_genome[0], int(args.write_genome[1]), args.write_genome[2])
+        return 0
+    results = run_benchmark(args)
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        sys.stdout.write("\n")
+    if args.compare:
+        with open(args.compare) as baseline:
+            if compare(results, json.load(baseline), args.threshold):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())